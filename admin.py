@@ -4,19 +4,12 @@ Admin Panel for TMASearcher
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
-import sqlite3
-import os
-
-admin_bp = Blueprint('admin', __name__)
-
-DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
 
+from db import get_db
+from query_cache import response_cache
+from titles import normalize_title
 
-def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+admin_bp = Blueprint('admin', __name__)
 
 
 def admin_required(f):
@@ -75,9 +68,8 @@ def dashboard():
     ''')
     recent_comments = cursor.fetchall()
 
-    conn.close()
-
     return render_template('admin/dashboard.html',
+                           cache_stats=response_cache.stats(),
                            user_count=user_count,
                            comment_count=comment_count,
                            favorite_count=favorite_count,
@@ -108,7 +100,6 @@ def users():
         ORDER BY u.created_at DESC
     ''')
     users = cursor.fetchall()
-    conn.close()
 
     return render_template('admin/users.html', users=users)
 
@@ -125,7 +116,6 @@ def toggle_user_active(user_id):
     cursor = conn.cursor()
     cursor.execute('UPDATE users SET is_active = NOT is_active WHERE id = ?', (user_id,))
     conn.commit()
-    conn.close()
 
     flash('User status updated.', 'success')
     return redirect(url_for('admin.users'))
@@ -143,7 +133,6 @@ def toggle_user_admin(user_id):
     cursor = conn.cursor()
     cursor.execute('UPDATE users SET is_admin = NOT is_admin WHERE id = ?', (user_id,))
     conn.commit()
-    conn.close()
 
     flash('User admin status updated.', 'success')
     return redirect(url_for('admin.users'))
@@ -172,7 +161,6 @@ def delete_user(user_id):
     else:
         flash('User not found.', 'danger')
 
-    conn.close()
     return redirect(url_for('admin.users'))
 
 
@@ -208,7 +196,6 @@ def comments():
         LIMIT ? OFFSET ?
     ''', (per_page, offset))
     comments = cursor.fetchall()
-    conn.close()
 
     total_pages = (total + per_page - 1) // per_page
 
@@ -227,7 +214,7 @@ def delete_comment(comment_id):
     cursor = conn.cursor()
     cursor.execute('DELETE FROM comments WHERE id = ?', (comment_id,))
     conn.commit()
-    conn.close()
+    response_cache.invalidate('comments')
 
     flash('Comment deleted.', 'success')
     return redirect(url_for('admin.comments'))
@@ -283,7 +270,6 @@ def episodes():
         ''', (per_page, offset))
 
     episodes = cursor.fetchall()
-    conn.close()
 
     total_pages = (total + per_page - 1) // per_page
 
@@ -316,11 +302,11 @@ def edit_episode(episode_id):
 
         cursor.execute(f'''
             UPDATE {table_name}
-            SET title = ?, date = ?, url = ?, show_notes = ?, mp3url = ?
+            SET title = ?, title_key = ?, date = ?, url = ?, show_notes = ?, mp3url = ?
             WHERE id = ?
-        ''', (title, date, url, show_notes, mp3url, episode_id))
+        ''', (title, normalize_title(title), date, url, show_notes, mp3url, episode_id))
         conn.commit()
-        conn.close()
+        response_cache.invalidate(table_name)
 
         flash('Episode updated.', 'success')
         return redirect(url_for('admin.episodes', podcast=podcast))
@@ -332,7 +318,6 @@ def edit_episode(episode_id):
         WHERE id = ?
     ''', (episode_id,))
     episode = cursor.fetchone()
-    conn.close()
 
     if not episode:
         flash('Episode not found.', 'danger')
@@ -353,7 +338,7 @@ def delete_episode(episode_id):
     cursor = conn.cursor()
     cursor.execute(f'DELETE FROM {table_name} WHERE id = ?', (episode_id,))
     conn.commit()
-    conn.close()
+    response_cache.invalidate(table_name)
 
     flash('Episode deleted.', 'success')
     return redirect(url_for('admin.episodes', podcast=podcast))
@@ -1,16 +1,24 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 import sqlite3
 import os
-import requests
+import json
+import base64
+import binascii
 from datetime import datetime, timedelta
 from urllib.parse import quote
 from dotenv import load_dotenv
-from fuzzywuzzy import process
 import re
 from flask_login import LoginManager, current_user, login_required
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+from spotify_links import SPOTIFY_TABLES, find_spotify_url, link_new_episode
+from scrapers.spotify import get_client as get_spotify_client
+from query_cache import cached_count
+from stream_counter import RecentPlays, StreamCounter, listener_key
+from http_cache import COUNTER_TABLES, cached_response, conditional_get
+from db import get_db, get_read_db, release_db, start_snapshot_refresher
+
 # Load environment variables (use absolute paths for WSGI compatibility)
 basedir = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(basedir, '.env'))  # Flask config (SECRET_KEY, etc.)
@@ -23,7 +31,6 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY')
 if not app.secret_key:
     raise RuntimeError("SECRET_KEY environment variable must be set in .env")
-db_path = os.environ.get('DATABASE_URL', 'TMASTL.db')  # 'TMASTL.db' is the default value if the environment variable is not set
 
 # Rate limiting for security (only applied to specific sensitive endpoints)
 limiter = Limiter(
@@ -32,6 +39,22 @@ limiter = Limiter(
     storage_uri="memory://"
 )
 
+# Connections are reused per thread (see db.py); roll back anything a request leaves open
+app.teardown_appcontext(release_db)
+
+# Public read routes can run against a periodically refreshed copy (DATABASE_SNAPSHOT)
+start_snapshot_refresher()
+
+# Play counts are batched in memory (optionally journaled) and flushed periodically
+stream_counter = StreamCounter(
+    flush_interval=int(os.environ.get('STREAM_FLUSH_INTERVAL', '5')),
+    journal_path=os.environ.get('STREAM_JOURNAL')
+)
+stream_counter.start()
+
+# Repeat plays by the same listener within the cooldown are not counted again
+recent_plays = RecentPlays()
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -115,19 +138,127 @@ def parse_date_input(date_input):
     # Fallback: use original input with wildcard (existing behavior)
     return f'%{date_input}%'
 
+def encode_cursor(values):
+    """Opaque keyset cursor holding the sort key of the last row on a page."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, types):
+    """Sort key stored by encode_cursor(), or None if the token is malformed.
+
+    types gives the expected type of each value in the key, so a crafted
+    cursor cannot pass a list or object through to the query parameters.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    # bool is an int to isinstance(), but never part of a sort key
+    if not all(isinstance(value, kind) and not isinstance(value, bool) for value, kind in zip(values, types)):
+        return None
+    return values
+
+
+def cursor_pagination(rows, per_page, sort_key):
+    """Trim a LIMIT per_page + 1 fetch to one page and describe the next one.
+
+    Keyset pages skip the COUNT(*) query, so there is no total here; clients
+    follow next_cursor until has_next is false.
+    """
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return rows, {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(sort_key(rows[-1])) if has_next else None
+    }
+
+
+# Output key -> column for fields= on the episode listing APIs. 'snippet' is
+# a window of the show notes, built in SQL by episode_columns().
+EPISODE_FIELDS = {
+    'id': 'ID', 'title': 'TITLE', 'date': 'DATE', 'url': 'URL', 'show_notes': 'SHOW_NOTES', 'snippet': None,
+    'mp3url': 'mp3url', 'comments_count': 'comments_count', 'favorites_count': 'favorites_count',
+    'likes_count': 'likes_count', 'streams_count': 'streams_count'
+}
+
+# Snippet size, and how much of it comes before the first show-notes search hit
+SNIPPET_LENGTH = 240
+SNIPPET_LEAD = 60
+
+
+def listing_fields(default_fields):
+    """Output keys for a listing, from fields= or view=summary; None if invalid.
+
+    view=summary is the route's default set with show_notes replaced by a
+    snippet, which is what the list views actually display.
+    """
+    if request.args.get('fields'):
+        return parse_fields(request.args.get('fields'), EPISODE_FIELDS)
+    if request.args.get('view') == 'summary':
+        return ['snippet' if f == 'show_notes' else f for f in default_fields]
+    return list(default_fields)
+
+
+def episode_columns(fields, key_columns=(), snippet_term=None):
+    """SELECT list for the requested fields; returns (sql, params).
+
+    key_columns are selected as-is in front so routes can still build cursors
+    from them by name. The snippet starts a little before the first
+    occurrence of snippet_term when given, otherwise at the start of the notes.
+    """
+    columns = list(key_columns)
+    params = []
+    for field in fields:
+        if field != 'snippet':
+            columns.append(f"{EPISODE_FIELDS[field]} AS {field}")
+        elif snippet_term:
+            notes = "LOWER(REPLACE(REPLACE(SHOW_NOTES, '''', '’'), '‘', '’'))"
+            columns.append(f"SUBSTR(SHOW_NOTES, MAX(1, INSTR({notes}, ?) - {SNIPPET_LEAD}), {SNIPPET_LENGTH}) AS snippet")
+            params.append(snippet_term.lower())
+        else:
+            columns.append(f"SUBSTR(SHOW_NOTES, 1, {SNIPPET_LENGTH}) AS snippet")
+    return ', '.join(columns), params
+
+
+def episode_json(row, fields):
+    """Dict of the requested fields from a row selected with episode_columns()."""
+    return {f: (row[f] or 0) if f.endswith('_count') else row[f] for f in fields}
+
+
+def highlight_offsets(text, terms):
+    """Merged [start, end) character ranges where any term occurs in text, ignoring case."""
+    if not text:
+        return []
+    # Apostrophe mapping keeps string length, so offsets still index the original text
+    haystack = standardize_apostrophes(text).lower()
+    spans = []
+    for term in terms:
+        needle = term.lower()
+        if not needle:
+            continue
+        start = haystack.find(needle)
+        while start != -1:
+            spans.append([start, start + len(needle)])
+            start = haystack.find(needle, start + 1)
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
 def get_spotify_access_token():
-    """Retrieve Spotify access token."""
-    client_id = os.environ.get('SPOTIFY_CLIENT_ID')
-    client_secret = os.environ.get('SPOTIFY_CLIENT_SECRET')
-
-    response = requests.post(
-        'https://accounts.spotify.com/api/token',
-        data={'grant_type': 'client_credentials'},
-        auth=(client_id, client_secret)
-    )
-    if response.status_code != 200:
+    """Retrieve Spotify access token, reusing the cached one until it expires."""
+    token = get_spotify_client().access_token()
+    if token is None:
         raise Exception('Failed to retrieve Spotify access token')
-    return response.json()['access_token']
+    return token
 
 @app.route('/')
 def index():
@@ -141,44 +272,64 @@ def favorites():
 def search_spotify():
     title = request.args.get('title')
     current_podcast = request.args.get('currentPodcast')
+    episode_id = request.args.get('id', type=int)
 
-    podcast_table_map = {
-        'TMA': 'TMASpot',
-        'Balloon Party': 'BalloonSpot',
-        'The Tim McKernan Show': 'TMShowSpot'
-    }
+    valid_podcasts = {'TMA': 'TMA', 'The Tim McKernan Show': 'TMShow', 'Balloon Party': 'Balloon'}
 
-    table_name = podcast_table_map.get(current_podcast)
+    table_name = valid_podcasts.get(current_podcast)
     if not table_name:
         return jsonify({'error': 'Invalid podcast name'}), 400
 
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_db()
         cursor = conn.cursor()
-        cursor.execute(f"SELECT Title, URL FROM {table_name}")
-        episodes = cursor.fetchall()
 
-        # Use fuzzy matching to find the best match
-        match = process.extractOne(title, [ep[0] for ep in episodes], score_cutoff=80)
-        if match:
-            matched_title = match[0]  # Only retrieve the matched title
-            # Find the URL of the matched title
-            url = next((ep[1] for ep in episodes if ep[0] == matched_title), None)
-            if url:
-                return jsonify({'spotifyUrl': url})
-            else:
-                return jsonify({'error': 'URL not found for matched episode'}), 404
-        else:
+        # Episodes are linked by the Spotify scrapers, so this is usually a single lookup
+        if episode_id is not None:
+            cursor.execute(f"SELECT TITLE, DATE, spotify_url FROM {table_name} WHERE ID = ?", (episode_id,))
+            row = cursor.fetchone()
+            if row and row[2]:
+                return jsonify({'spotifyUrl': row[2]})
+            if row:
+                # Not linked yet: store a link only if it passes the same date
+                # window and not-linked-elsewhere checks the scrapers use
+                url = link_new_episode(cursor, table_name, episode_id, row[0], row[1])
+                if url:
+                    conn.commit()
+                    return jsonify({'spotifyUrl': url})
+                title = row[0]
+
+        if not title:
             return jsonify({'error': 'Episode not found'}), 404
+
+        # Fall back to a best-effort fuzzy match, which is not saved
+        url = find_spotify_url(cursor, SPOTIFY_TABLES[table_name], title)
+        if not url:
+            return jsonify({'error': 'Episode not found'}), 404
+
+        return jsonify({'spotifyUrl': url})
     except sqlite3.Error as e:
         return jsonify({'error': f'Database error: {e}'}), 500
-    finally:
-        conn.close()
+
+def podcast_tables(arg, with_counters=True):
+    """conditional_get() tables for a route whose podcast comes from request arg."""
+    valid_podcasts = {'TMA': 'TMA', 'The Tim McKernan Show': 'TMShow', 'Balloon Party': 'Balloon'}
+
+    def tables(*args, **kwargs):
+        table_name = valid_podcasts.get(request.args.get(arg, 'TMA'))
+        if table_name is None:
+            return None
+        return [table_name] + (COUNTER_TABLES if with_counters else [])
+    return tables
+
 
 @app.route('/recent_episodes', methods=['GET'])
+@conditional_get(podcast_tables('podcast'))
+@cached_response(podcast_tables('podcast'))
 def recent_episodes():
     podcast_name = request.args.get('podcast', default='TMA')  # Default to TMA if no podcast is specified
     page = request.args.get('page', 1, type=int)
+    page_cursor = request.args.get('cursor')  # Keyset mode when present ('' for the first page)
     per_page = 50  # Episodes per page
     
     valid_podcasts = {'TMA': 'TMA', 'The Tim McKernan Show': 'TMShow', 'Balloon Party': 'Balloon'}
@@ -187,33 +338,46 @@ def recent_episodes():
     if not table_name:
         return jsonify({'error': 'Invalid podcast name'}), 400
 
-    conn = sqlite3.connect(db_path)
+    fields = listing_fields(['id', 'title', 'date', 'url', 'show_notes', 'mp3url', 'comments_count', 'favorites_count', 'likes_count'])
+    if fields is None:
+        return jsonify({'error': 'Invalid fields'}), 400
+
+    after = None
+    if page_cursor:
+        after = decode_cursor(page_cursor, (str, int))  # (DATE, ID) of the last row on the previous page
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    conn = get_read_db()
     cursor = conn.cursor()
     thirty_days_ago = datetime.now() - timedelta(days=90)
-    
-    # Get total count for pagination
-    count_query = f"SELECT COUNT(*) FROM {table_name} WHERE DATE >= ?"
-    cursor.execute(count_query, (thirty_days_ago.strftime('%Y-%m-%d'),))
-    total_count = cursor.fetchone()[0]
-    
-    # Get paginated results
-    offset = (page - 1) * per_page
-    query = f"SELECT ID, TITLE, DATE, URL, SHOW_NOTES, mp3url, comments_count, favorites_count, likes_count FROM {table_name} WHERE DATE >= ? ORDER BY DATE DESC LIMIT ? OFFSET ?"
-    cursor.execute(query, (thirty_days_ago.strftime('%Y-%m-%d'), per_page, offset))
-    episodes = cursor.fetchall()
-    conn.close()
+    columns, _ = episode_columns(fields, key_columns=['ID', 'DATE'])
+
+    if page_cursor is not None:
+        # Seek past the previous page through the DATE index instead of counting and skipping rows
+        where_clause = "DATE >= ?"
+        params = [thirty_days_ago.strftime('%Y-%m-%d')]
+        if after:
+            where_clause += " AND (DATE, ID) < (?, ?)"
+            params.extend(after)
+        query = f"SELECT {columns} FROM {table_name} WHERE {where_clause} ORDER BY DATE DESC, ID DESC LIMIT ?"
+        cursor.execute(query, params + [per_page + 1])
+        episodes, pagination = cursor_pagination(cursor.fetchall(), per_page, lambda e: (e['DATE'], e['ID']))
+    else:
+        # Get total count for pagination (cached until the table changes)
+        total_count = cached_count(cursor, table_name, "DATE >= ?", [thirty_days_ago.strftime('%Y-%m-%d')])
 
-    # Calculate pagination info
-    total_pages = (total_count + per_page - 1) // per_page
-    has_next = page < total_pages
-    has_prev = page > 1
+        # Get paginated results
+        offset = (page - 1) * per_page
+        query = f"SELECT {columns} FROM {table_name} WHERE DATE >= ? ORDER BY DATE DESC LIMIT ? OFFSET ?"
+        cursor.execute(query, (thirty_days_ago.strftime('%Y-%m-%d'), per_page, offset))
+        episodes = cursor.fetchall()
 
-    # include the mp3url, comments_count, favorites_count, and likes_count
-    episodes_json = [{'id': e[0], 'title': e[1], 'date': e[2], 'url': e[3], 'show_notes': e[4], 'mp3url': e[5], 'comments_count': e[6] or 0, 'favorites_count': e[7] or 0, 'likes_count': e[8] or 0} for e in episodes]
-    
-    return jsonify({
-        'episodes': episodes_json,
-        'pagination': {
+        # Calculate pagination info
+        total_pages = (total_count + per_page - 1) // per_page
+        has_next = page < total_pages
+        has_prev = page > 1
+        pagination = {
             'page': page,
             'per_page': per_page,
             'total': total_count,
@@ -223,16 +387,22 @@ def recent_episodes():
             'next_num': page + 1 if has_next else None,
             'prev_num': page - 1 if has_prev else None
         }
+
+    # include the mp3url, comments_count, favorites_count, and likes_count
+    episodes_json = [episode_json(e, fields) for e in episodes]
+    
+    return jsonify({
+        'episodes': episodes_json,
+        'pagination': pagination
     })
 
 @app.route('/episode/<int:episode_id>')
 def episode(episode_id):
-    conn = sqlite3.connect(db_path)
+    conn = get_read_db()
     cursor = conn.cursor()
 
     cursor.execute("SELECT title, date, url, show_notes, mp3url, comments_count, favorites_count, likes_count FROM TMA WHERE id = ?", (episode_id,))
     episode = cursor.fetchone()
-    conn.close()
 
     if episode:
         episode_data = {
@@ -250,54 +420,183 @@ def episode(episode_id):
     else:
         return "Episode not found", 404
 
+# Output name -> column for /get_podcast_data, in the default output order
+PODCAST_DATA_FIELDS = {'title': 'TITLE', 'date': 'DATE', 'url': 'URL', 'show_notes': 'SHOW_NOTES', 'mp3url': 'mp3url'}
+
+# Rows fetched per round trip while streaming a whole table
+STREAM_FETCH_SIZE = 500
+
+
+def parse_fields(value, allowed):
+    """Split a comma-separated fields= value; None if it names an unknown field."""
+    if not value:
+        return list(allowed)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    if not fields or any(f not in allowed for f in fields):
+        return None
+    return fields
+
+
 @app.route('/get_podcast_data', methods=['GET'])
+@conditional_get(podcast_tables('podcast', with_counters=False))
 def get_podcast_data():
+    """Every episode of a podcast, streamed as a JSON array or as NDJSON.
+
+    fields= picks the keys to send (e.g. fields=title,date,url to skip the
+    show notes); format=ndjson sends one JSON object per line.
+    """
     podcast_name = request.args.get('podcast')
     # Validate the podcast_name against a predefined list of valid names
     valid_podcasts = {'TMA': 'TMA', 'The Tim McKernan Show': 'TMShow', 'Balloon Party': 'Balloon'}
 
+    fields = parse_fields(request.args.get('fields'), PODCAST_DATA_FIELDS)
+    if fields is None:
+        return jsonify({'error': f"Invalid fields; choose from {', '.join(PODCAST_DATA_FIELDS)}"}), 400
+
+    output_format = request.args.get('format', 'json')
+    if output_format not in ('json', 'ndjson'):
+        return jsonify({'error': 'Invalid format'}), 400
+
     table_name = valid_podcasts.get(podcast_name)
     if table_name is not None:
-        conn = sqlite3.connect(db_path)
+        conn = get_read_db()
         cursor = conn.cursor()
-        query = f"SELECT * FROM {table_name} ORDER BY DATE DESC"
-        cursor.execute(query)
-        episodes = cursor.fetchall()
-        conn.close()
-
-        episodes_json = [{'title': e[1], 'date': e[2], 'url': e[3], 'show_notes': e[4], 'mp3url': e[5]} for e in episodes]
-        return jsonify(episodes_json)
+        columns = ', '.join(PODCAST_DATA_FIELDS[f] for f in fields)
+        cursor.execute(f"SELECT {columns} FROM {table_name} ORDER BY DATE DESC")
+
+        def generate():
+            # Rows are encoded batch by batch, so memory stays flat however big the table is
+            first = True
+            if output_format == 'json':
+                yield '['
+            while True:
+                rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    item = json.dumps(dict(zip(fields, row)))
+                    if output_format == 'ndjson':
+                        yield item + '\n'
+                    else:
+                        yield item if first else ',' + item
+                    first = False
+            if output_format == 'json':
+                yield ']'
+
+        mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'application/json'
+        return Response(stream_with_context(generate()), mimetype=mimetype)
     else:
         return jsonify({'error': 'Invalid podcast name'}), 400
 
 
 
-def build_search_filters(title, date, notes, match_type):
-    """Return an SQL WHERE clause and parameters for podcast searches."""
+# The trigram tokenizer behind the <table>_fts indexes cannot match shorter terms
+FTS_MIN_TERM_LENGTH = 3
+
+# bm25() column weights for podcast searches: a title hit outweighs a show-notes hit
+SEARCH_RANK_WEIGHTS = (10.0, 1.0)
+
+
+def standardize_apostrophes(text):
+    """Map straight and left single quotes to the form stored in the FTS index."""
+    return text.replace("'", "’").replace("‘", "’") if text else text
+
+
+# Tables whose <table>_fts index has been seen; only hits are remembered, so
+# running migrate_search_index.py takes effect without a restart
+_fts_tables = set()
+
+
+def fts_available(table_name):
+    """Whether <table>_fts exists. Without it, text searches fall back to LIKE scans."""
+    if table_name in _fts_tables:
+        return True
+    row = get_read_db().execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f'{table_name}_fts',)
+    ).fetchone()
+    if row:
+        _fts_tables.add(table_name)
+    return row is not None
+
+
+def fts_phrase(column, text):
+    """Quote text as an FTS5 phrase restricted to a single column."""
+    return column + ' : "' + text.replace('"', '""') + '"'
+
+
+def build_text_conditions(terms, match_type, table_name, key_column, ranked=False):
+    """Turn (column, text) search terms into conditions backed by <table>_fts.
+
+    Terms of trigram length or longer are combined into one MATCH expression
+    (OR for 'any', AND otherwise); shorter terms fall back to a LIKE scan
+    since the index cannot match them. Normally the MATCH runs in an IN
+    subquery. With ranked=True the caller joins the scored index rows from
+    ranked_fts_join() instead and the condition only checks for a hit.
 
-    def standardize_apostrophes(text):
-        return text.replace("'", "’") if text else text
+    Until migrate_search_index.py has created the table's index, every term
+    is a LIKE scan and match_query is None, so there is nothing to rank.
 
-    std_title = standardize_apostrophes(title or '')
-    std_notes = standardize_apostrophes(notes or '')
+    Returns (conditions, params, match_query).
+    """
+    use_fts = fts_available(table_name)
+    phrases = [fts_phrase(column, text) for column, text in terms if use_fts and len(text) >= FTS_MIN_TERM_LENGTH]
+
+    conditions = []
+    params = []
+    match_query = None
+
+    if phrases:
+        match_query = (' OR ' if match_type == 'any' else ' AND ').join(phrases)
+        if ranked:
+            conditions.append("fts.rowid IS NOT NULL")
+        else:
+            conditions.append(f"{table_name}.{key_column} IN (SELECT rowid FROM {table_name}_fts WHERE {table_name}_fts MATCH ?)")
+            params.append(match_query)
+
+    for column, text in terms:
+        if not use_fts or len(text) < FTS_MIN_TERM_LENGTH:
+            conditions.append(f"REPLACE(REPLACE({column}, '''', '’'), '‘', '’') LIKE ?")
+            params.append(f'%{text}%')
+
+    return conditions, params, match_query
+
+
+def ranked_fts_join(table_name, key_column, weights=()):
+    """LEFT JOIN exposing each matched row's bm25() score as fts.score.
+
+    Takes the match_query from build_text_conditions() as its only parameter.
+    bm25() is lower-is-better, and weights scale each indexed column in order.
+    """
+    weight_args = ''.join(f', {weight}' for weight in weights)
+    return (
+        f"LEFT JOIN (SELECT rowid, bm25({table_name}_fts{weight_args}) AS score "
+        f"FROM {table_name}_fts WHERE {table_name}_fts MATCH ?) AS fts "
+        f"ON fts.rowid = {table_name}.{key_column}"
+    )
 
-    text_conditions = []
-    text_params = []
 
+def search_words(text, match_type):
+    """Terms typed in one search box: the whole phrase for 'exact', otherwise each word."""
+    text = standardize_apostrophes(text or '').strip()
     if match_type == 'exact':
-        if std_title:
-            text_conditions.append("REPLACE(TITLE, '''', '’') LIKE ?")
-            text_params.append(f'%{std_title}%')
-        if std_notes:
-            text_conditions.append("REPLACE(SHOW_NOTES, '''', '’') LIKE ?")
-            text_params.append(f'%{std_notes}%')
-    else:
-        for word in std_title.split():
-            text_conditions.append("REPLACE(TITLE, '''', '’') LIKE ?")
-            text_params.append(f'%{word}%')
-        for word in std_notes.split():
-            text_conditions.append("REPLACE(SHOW_NOTES, '''', '’') LIKE ?")
-            text_params.append(f'%{word}%')
+        return [text] if text else []
+    return text.split()
+
+
+def build_search_filters(title, date, notes, match_type, table_name, ranked=False):
+    """Return an SQL WHERE clause, its parameters and the FTS match query for podcast searches.
+
+    Text terms are answered by the <table>_fts index (see migrate_search_index.py),
+    or by LIKE scans while it does not exist.
+    Pass ranked=True when the query joins ranked_fts_join(); the match query
+    then becomes that join's parameter instead of part of the WHERE params.
+    """
+    terms = [('TITLE', word) for word in search_words(title, match_type)]
+    terms += [('SHOW_NOTES', word) for word in search_words(notes, match_type)]
+
+    text_conditions, text_params, match_query = build_text_conditions(
+        terms, match_type, table_name, 'ID', ranked=ranked
+    )
 
     date_condition = None
     date_param = None
@@ -329,17 +628,20 @@ def build_search_filters(title, date, notes, match_type):
         clauses.append("1 = 1")
 
     where_clause = " AND ".join(clauses)
-    return where_clause, params
+    return where_clause, params, match_query
 
 
 @app.route('/search', methods=['GET'])
+@conditional_get(podcast_tables('currentPodcast'))
 def search():
     title = request.args.get('title', '')
     date = request.args.get('date', '')
     notes = request.args.get('notes', '')
     current_podcast = request.args.get('currentPodcast', 'TMA')  # Default to TMA if not provided
     match_type = request.args.get('matchType', 'all')
+    sort = request.args.get('sort', 'date')  # date, relevance
     page = request.args.get('page', 1, type=int)
+    page_cursor = request.args.get('cursor')  # Keyset mode when present ('' for the first page)
     per_page = 50  # Results per page
 
     # Validate the podcast_name against a predefined list of valid names
@@ -347,47 +649,94 @@ def search():
     table_name = valid_podcasts.get(current_podcast)  # return None if the podcast_name is not valid
 
     if table_name is not None:
-        where_clause, base_params = build_search_filters(title, date, notes, match_type)
-
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-
-            count_query = f"SELECT COUNT(*) FROM {table_name} WHERE {where_clause}"
-            cursor.execute(count_query, base_params)
-            total_count = cursor.fetchone()[0]
-
-            total_pages = (total_count + per_page - 1) // per_page
-            has_next = page < total_pages
-            has_prev = page > 1
-
-            start = (page - 1) * per_page
-            data_query = (
-                f"SELECT ID, TITLE, DATE, URL, SHOW_NOTES, mp3url, comments_count, favorites_count, likes_count FROM {table_name} "
-                f"WHERE {where_clause} ORDER BY DATE DESC LIMIT ? OFFSET ?"
+        after = None
+        if page_cursor is not None and sort == 'relevance':
+            return jsonify({'error': 'Cursor pagination is only available for date ordering'}), 400
+        if page_cursor:
+            after = decode_cursor(page_cursor, (str, int))  # (DATE, ID) of the last row on the previous page
+            if after is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        fields = listing_fields(['id', 'title', 'date', 'url', 'show_notes', 'mp3url', 'comments_count', 'favorites_count', 'likes_count'])
+        if fields is None:
+            return jsonify({'error': 'Invalid fields'}), 400
+
+        where_clause, base_params, _ = build_search_filters(title, date, notes, match_type, table_name)
+
+        # Relevance ordering needs an FTS match to score; otherwise fall back to newest first
+        data_from, data_where, data_params, order_by = table_name, where_clause, list(base_params), 'DATE DESC'
+        if sort == 'relevance':
+            rank_where, rank_params, match_query = build_search_filters(
+                title, date, notes, match_type, table_name, ranked=True
             )
-            data_params = base_params + [per_page, start]
-
-            cursor.execute(data_query, data_params)
-            paginated_results = cursor.fetchall()
+            if match_query:
+                data_from = f"{table_name} {ranked_fts_join(table_name, 'ID', SEARCH_RANK_WEIGHTS)}"
+                data_where = rank_where
+                data_params = [match_query] + rank_params
+                order_by = 'fts.score IS NULL, fts.score, DATE DESC'
+
+        # Snippets open at the first show-notes term and come with highlight offsets
+        title_words = search_words(title, match_type)
+        notes_words = search_words(notes, match_type)
+        columns, column_params = episode_columns(
+            fields, key_columns=['ID', 'DATE'], snippet_term=notes_words[0] if notes_words else None
+        )
+        data_params = column_params + data_params
+
+        with get_read_db() as conn:
+            cursor = conn.cursor()
 
-        podcasts = [
-            {'id': row[0], 'title': row[1], 'date': row[2], 'url': row[3], 'show_notes': row[4], 'mp3url': row[5], 'comments_count': row[6] or 0, 'favorites_count': row[7] or 0, 'likes_count': row[8] or 0}
-            for row in paginated_results
-        ]
+            if page_cursor is not None:
+                # Keyset page: seek past the last (DATE, ID) and skip the COUNT(*)
+                if after:
+                    data_where = f"({data_where}) AND (DATE, ID) < (?, ?)"
+                    data_params = data_params + after
+                data_query = (
+                    f"SELECT {columns} FROM {data_from} "
+                    f"WHERE {data_where} ORDER BY DATE DESC, ID DESC LIMIT ?"
+                )
+                cursor.execute(data_query, data_params + [per_page + 1])
+                paginated_results, pagination = cursor_pagination(cursor.fetchall(), per_page, lambda row: (row['DATE'], row['ID']))
+                total_count = None
+            else:
+                total_count = cached_count(cursor, table_name, where_clause, base_params)
+
+                total_pages = (total_count + per_page - 1) // per_page
+                has_next = page < total_pages
+                has_prev = page > 1
+
+                start = (page - 1) * per_page
+                data_query = (
+                    f"SELECT {columns} FROM {data_from} "
+                    f"WHERE {data_where} ORDER BY {order_by} LIMIT ? OFFSET ?"
+                )
+
+                cursor.execute(data_query, data_params + [per_page, start])
+                paginated_results = cursor.fetchall()
+                pagination = {
+                    'page': page,
+                    'per_page': per_page,
+                    'total': total_count,
+                    'total_pages': total_pages,
+                    'has_next': has_next,
+                    'has_prev': has_prev,
+                    'next_num': page + 1 if has_next else None,
+                    'prev_num': page - 1 if has_prev else None
+                }
+
+        podcasts = [episode_json(row, fields) for row in paginated_results]
+        if 'snippet' in fields:
+            for podcast in podcasts:
+                podcast['highlights'] = {
+                    'title': highlight_offsets(podcast.get('title') or '', title_words),
+                    'snippet': highlight_offsets(podcast['snippet'], notes_words)
+                }
 
         results = {
-            'count': total_count,  # Total count of all results
+            'count': total_count,  # Total count of all results (None for keyset pages)
             'podcasts': podcasts,  # Current page results
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total_count,
-                'total_pages': total_pages,
-                'has_next': has_next,
-                'has_prev': has_prev,
-                'next_num': page + 1 if has_next else None,
-                'prev_num': page - 1 if has_prev else None
-            }
+            'sort': sort,
+            'pagination': pagination
         }
         return jsonify(results)
     else:
@@ -404,14 +753,38 @@ def popular_episodes_page():
     return render_template('popular.html')
 
 
+def popular_tables(*args, **kwargs):
+    """cached_response() tags for /api/popular_episodes.
+
+    Stream counts are flushed every few seconds, so only the streams ranking
+    follows them; the other rankings show stream counts up to the response
+    cache's ttl old.
+    """
+    if request.args.get('sort') == 'streams':
+        return ['TMA', 'streams'] + COUNTER_TABLES
+    return ['TMA'] + COUNTER_TABLES
+
+
 @app.route('/api/popular_episodes', methods=['GET'])
+@cached_response(popular_tables)
 def popular_episodes_api():
     """Get popular episodes sorted by engagement metrics."""
     sort_by = request.args.get('sort', 'likes')  # likes, favorites, comments, streams
     page = request.args.get('page', 1, type=int)
+    page_cursor = request.args.get('cursor')  # Keyset mode when present ('' for the first page)
     per_page = 30
 
-    conn = sqlite3.connect(db_path)
+    fields = listing_fields(['id', 'title', 'date', 'url', 'show_notes', 'mp3url', 'favorites_count', 'comments_count', 'likes_count', 'streams_count'])
+    if fields is None:
+        return jsonify({'error': 'Invalid fields'}), 400
+
+    after = None
+    if page_cursor:
+        after = decode_cursor(page_cursor, (int, str, int))  # (metric, date, id) of the last row on the previous page
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    conn = get_read_db()
     cursor = conn.cursor()
 
     # Determine sort column
@@ -424,49 +797,50 @@ def popular_episodes_api():
     else:
         sort_col = 'likes_count'
 
-    # Get total count of episodes with at least 1 engagement
-    cursor.execute(f'''
-        SELECT COUNT(*) FROM TMA
-        WHERE {sort_col} > 0
-    ''')
-    total_count = cursor.fetchone()[0]
-
-    # Get paginated results
-    offset = (page - 1) * per_page
-    cursor.execute(f'''
-        SELECT id, title, date, url, show_notes, mp3url,
-               favorites_count, comments_count, likes_count, streams_count
-        FROM TMA
-        WHERE {sort_col} > 0
-        ORDER BY {sort_col} DESC, date DESC
-        LIMIT ? OFFSET ?
-    ''', (per_page, offset))
+    columns, _ = episode_columns(fields, key_columns=['id', 'date', sort_col])
 
-    episodes = cursor.fetchall()
-    conn.close()
+    if page_cursor is not None:
+        # Seek past the last (metric, date, id) instead of counting and skipping rows
+        where_clause = f"{sort_col} > 0"
+        params = []
+        if after:
+            where_clause += f" AND ({sort_col}, date, id) < (?, ?, ?)"
+            params.extend(after)
+        cursor.execute(f'''
+            SELECT {columns}
+            FROM TMA
+            WHERE {where_clause}
+            ORDER BY {sort_col} DESC, date DESC, id DESC
+            LIMIT ?
+        ''', params + [per_page + 1])
+        episodes, pagination = cursor_pagination(
+            cursor.fetchall(), per_page, lambda e: (e[sort_col], e['date'], e['id'])
+        )
+    else:
+        # Get total count of episodes with at least 1 engagement
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM TMA
+            WHERE {sort_col} > 0
+        ''')
+        total_count = cursor.fetchone()[0]
 
-    # Calculate pagination
-    total_pages = max(1, (total_count + per_page - 1) // per_page)
-    has_next = page < total_pages
-    has_prev = page > 1
+        # Get paginated results
+        offset = (page - 1) * per_page
+        cursor.execute(f'''
+            SELECT {columns}
+            FROM TMA
+            WHERE {sort_col} > 0
+            ORDER BY {sort_col} DESC, date DESC
+            LIMIT ? OFFSET ?
+        ''', (per_page, offset))
 
-    episodes_json = [{
-        'id': e[0],
-        'title': e[1],
-        'date': e[2],
-        'url': e[3],
-        'show_notes': e[4],
-        'mp3url': e[5],
-        'favorites_count': e[6] or 0,
-        'comments_count': e[7] or 0,
-        'likes_count': e[8] or 0,
-        'streams_count': e[9] or 0
-    } for e in episodes]
+        episodes = cursor.fetchall()
 
-    return jsonify({
-        'episodes': episodes_json,
-        'sort_by': sort_by,
-        'pagination': {
+        # Calculate pagination
+        total_pages = max(1, (total_count + per_page - 1) // per_page)
+        has_next = page < total_pages
+        has_prev = page > 1
+        pagination = {
             'page': page,
             'per_page': per_page,
             'total': total_count,
@@ -476,39 +850,55 @@ def popular_episodes_api():
             'next_num': page + 1 if has_next else None,
             'prev_num': page - 1 if has_prev else None
         }
+
+    episodes_json = [episode_json(e, fields) for e in episodes]
+
+    return jsonify({
+        'episodes': episodes_json,
+        'sort_by': sort_by,
+        'pagination': pagination
     })
 
 
 @app.route('/fetch_archive_episodes', methods=['GET'])
+@conditional_get(['TMA_Archive'], max_age=300)
 def fetch_archive_episodes():
     page = request.args.get('page', 1, type=int)
+    page_cursor = request.args.get('cursor')  # Keyset mode when present ('' for the first page)
     per_page = 50  # Episodes per page
-    
-    conn = sqlite3.connect(db_path)
+
+    after = None
+    if page_cursor:
+        after = decode_cursor(page_cursor, (str, int))  # (date, rowid) of the last row on the previous page
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    conn = get_read_db()
     cursor = conn.cursor()
-    
-    # Get total count for pagination
-    count_query = "SELECT COUNT(*) FROM TMA_Archive"
-    cursor.execute(count_query)
-    total_count = cursor.fetchone()[0]
-    
-    # Get paginated results
-    offset = (page - 1) * per_page
-    query = "SELECT filename, date, mp3url FROM TMA_Archive ORDER BY date DESC LIMIT ? OFFSET ?"
-    cursor.execute(query, (per_page, offset))
-    episodes = cursor.fetchall()
-    conn.close()
-    
-    # Calculate pagination info
-    total_pages = (total_count + per_page - 1) // per_page
-    has_next = page < total_pages
-    has_prev = page > 1
-    
-    episodes_json = [{'filename': e[0], 'date': e[1], 'mp3url': e[2]} for e in episodes]
 
-    return jsonify({
-        'episodes': episodes_json,
-        'pagination': {
+    if page_cursor is not None:
+        # Seek past the last (date, rowid) through the date index instead of skipping rows
+        where_clause = "(date, rowid) < (?, ?)" if after else "1=1"
+        query = f"SELECT filename, date, mp3url, rowid FROM TMA_Archive WHERE {where_clause} ORDER BY date DESC, rowid DESC LIMIT ?"
+        cursor.execute(query, (after or []) + [per_page + 1])
+        episodes, pagination = cursor_pagination(cursor.fetchall(), per_page, lambda e: (e[1], e[3]))
+    else:
+        # Get total count for pagination
+        count_query = "SELECT COUNT(*) FROM TMA_Archive"
+        cursor.execute(count_query)
+        total_count = cursor.fetchone()[0]
+
+        # Get paginated results
+        offset = (page - 1) * per_page
+        query = "SELECT filename, date, mp3url FROM TMA_Archive ORDER BY date DESC LIMIT ? OFFSET ?"
+        cursor.execute(query, (per_page, offset))
+        episodes = cursor.fetchall()
+
+        # Calculate pagination info
+        total_pages = (total_count + per_page - 1) // per_page
+        has_next = page < total_pages
+        has_prev = page > 1
+        pagination = {
             'page': page,
             'per_page': per_page,
             'total': total_count,
@@ -518,59 +908,68 @@ def fetch_archive_episodes():
             'next_num': page + 1 if has_next else None,
             'prev_num': page - 1 if has_prev else None
         }
+
+    episodes_json = [{'filename': e[0], 'date': e[1], 'mp3url': e[2]} for e in episodes]
+
+    return jsonify({
+        'episodes': episodes_json,
+        'pagination': pagination
     })
 @app.route('/search_archive', methods=['GET'])
+@conditional_get(['TMA_Archive'], max_age=300)
 def search_archive():
     match_type = request.args.get('matchType')
     filename = request.args.get('filename', '').strip()
     date = request.args.get('date', '').strip()
+    sort = request.args.get('sort', 'date')  # date, relevance
     page = request.args.get('page', 1, type=int)
     per_page = 50  # Results per page
 
-    query = "SELECT filename, date, mp3url FROM TMA_Archive WHERE 1=1"
-    count_query = "SELECT COUNT(*) FROM TMA_Archive WHERE 1=1"
-    params = []
-
-    # Search by filename
-    if filename:
-        if match_type == 'all':
-            conditions = " AND " + " AND ".join([f"filename LIKE ?" for keyword in filename.split()])
-            query += conditions
-            count_query += conditions
-            params.extend([f'%{keyword}%' for keyword in filename.split()])
-        elif match_type == 'any':
-            conditions = " AND (" + " OR ".join([f"filename LIKE ?" for keyword in filename.split()]) + ")"
-            query += conditions
-            count_query += conditions
-            params.extend([f'%{keyword}%' for keyword in filename.split()])
-        elif match_type == 'exact':
-            conditions = " AND filename LIKE ?"
-            query += conditions
-            count_query += conditions
-            params.append(f'%{filename}%')
+    terms = []
+    std_filename = standardize_apostrophes(filename)
+    if filename and match_type in ('all', 'any'):
+        terms = [('filename', keyword) for keyword in std_filename.split()]
+    elif filename and match_type == 'exact':
+        terms = [('filename', std_filename)]
+
+    ranked = sort == 'relevance'
+    # rowid is TMA_Archive's id column once migrate_search_index.py has added it
+    conditions, params, match_query = build_text_conditions(
+        terms, match_type, 'TMA_Archive', 'rowid', ranked=ranked
+    )
+    if match_type == 'any' and conditions:
+        conditions = ["(" + " OR ".join(conditions) + ")"]
 
     # Search by date
     if date:
         date_pattern = parse_date_input(date)
         if date_pattern:
-            conditions = " AND date LIKE ?"
-            query += conditions
-            count_query += conditions
+            conditions.append("date LIKE ?")
             params.append(date_pattern)
 
-    conn = sqlite3.connect(db_path)
+    where_clause = " AND ".join(["1=1"] + conditions)
+    from_clause = "TMA_Archive"
+    order_by = "date DESC"
+    join_params = []
+    if ranked and match_query:
+        from_clause += " " + ranked_fts_join('TMA_Archive', 'rowid')
+        order_by = "fts.score IS NULL, fts.score, date DESC"
+        join_params = [match_query]
+
+    query = f"SELECT filename, date, mp3url FROM {from_clause} WHERE {where_clause}"
+    params = join_params + params
+
+    conn = get_read_db()
     cursor = conn.cursor()
     
-    # Get total count for pagination
-    cursor.execute(count_query, params)
-    total_count = cursor.fetchone()[0]
+    # Get total count for pagination (cached until the archive changes)
+    total_count = cached_count(cursor, 'TMA_Archive', where_clause, params, from_clause)
     
     # Add pagination to main query
-    query += " ORDER BY date DESC LIMIT ? OFFSET ?"
+    query += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
     offset = (page - 1) * per_page
     cursor.execute(query, params + [per_page, offset])
     episodes = cursor.fetchall()
-    conn.close()
     
     # Calculate pagination info
     total_pages = (total_count + per_page - 1) // per_page
@@ -581,6 +980,7 @@ def search_archive():
     
     return jsonify({
         'episodes': episodes_json,
+        'sort': sort,
         'pagination': {
             'page': page,
             'per_page': per_page,
@@ -596,7 +996,11 @@ def search_archive():
 @app.route('/related_episodes/<int:episode_id>')
 def related_episodes(episode_id):
     """Get related episodes from the same time period (±1 week)"""
-    conn = sqlite3.connect(db_path)
+    fields = listing_fields(['id', 'title', 'date', 'url', 'show_notes', 'mp3url'])
+    if fields is None:
+        return jsonify({'error': 'Invalid fields'}), 400
+
+    conn = get_read_db()
     cursor = conn.cursor()
     
     # Get the current episode's date
@@ -610,8 +1014,9 @@ def related_episodes(episode_id):
     
     # Query for episodes within ±1 week, excluding the current episode
     # Added randomization while still prioritizing proximity to date
-    query = """
-    SELECT id, title, date, url, show_notes, mp3url 
+    columns, _ = episode_columns(fields)
+    query = f"""
+    SELECT {columns}
     FROM TMA 
     WHERE id != ? 
     AND date BETWEEN date(?, '-7 days') AND date(?, '+7 days')
@@ -628,25 +1033,15 @@ def related_episodes(episode_id):
         related = random.sample(all_candidates, 4)
     else:
         related = all_candidates
-    conn.close()
     
-    related_episodes = []
-    for episode in related:
-        related_episodes.append({
-            'id': episode[0],
-            'title': episode[1],
-            'date': episode[2],
-            'url': episode[3],
-            'show_notes': episode[4],
-            'mp3url': episode[5]
-        })
+    related_episodes = [episode_json(episode, fields) for episode in related]
     
     return jsonify({'related_episodes': related_episodes})
 
 @app.route('/random_episode')
 def random_episode():
     """Get a random episode from the database"""
-    conn = sqlite3.connect(db_path)
+    conn = get_read_db()
     cursor = conn.cursor()
     
     # Get a random episode
@@ -658,7 +1053,6 @@ def random_episode():
     """)
     
     episode = cursor.fetchone()
-    conn.close()
     
     if episode:
         return jsonify({
@@ -688,8 +1082,7 @@ def notes():
 @login_required
 def get_favorites():
     """Get all favorites for the logged-in user."""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -713,7 +1106,6 @@ def get_favorites():
             'addedAt': row['created_at']
         })
 
-    conn.close()
     return jsonify({'favorites': favorites})
 
 
@@ -728,7 +1120,7 @@ def add_favorite():
     if not episode_id:
         return jsonify({'error': 'Episode ID required'}), 400
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     try:
@@ -741,8 +1133,6 @@ def add_favorite():
         return jsonify({'success': True, 'message': 'Added to favorites'})
     except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 @app.route('/api/favorites/<int:episode_id>', methods=['DELETE'])
@@ -751,7 +1141,7 @@ def remove_favorite(episode_id):
     """Remove an episode from user's favorites."""
     podcast_name = request.args.get('podcast_name', 'TMA')
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     try:
@@ -764,8 +1154,6 @@ def remove_favorite(episode_id):
         return jsonify({'success': True, 'message': 'Removed from favorites'})
     except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 @app.route('/api/favorites/check/<int:episode_id>', methods=['GET'])
@@ -774,7 +1162,7 @@ def check_favorite(episode_id):
     """Check if an episode is favorited by the user."""
     podcast_name = request.args.get('podcast_name', 'TMA')
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -783,7 +1171,6 @@ def check_favorite(episode_id):
     ''', (current_user.id, episode_id, podcast_name))
 
     is_favorited = cursor.fetchone() is not None
-    conn.close()
 
     return jsonify({'is_favorited': is_favorited})
 
@@ -807,12 +1194,12 @@ def auth_status():
 # ==========================================
 
 @app.route('/api/comments/<int:episode_id>', methods=['GET'])
+@conditional_get(['comments'])
 def get_comments(episode_id):
     """Get all comments for an episode (public endpoint)."""
     podcast_name = request.args.get('podcast_name', 'TMA')
 
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = get_read_db()
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -839,7 +1226,6 @@ def get_comments(episode_id):
             'likes_count': row['likes_count']
         })
 
-    conn.close()
     return jsonify({'comments': comments, 'count': len(comments)})
 
 
@@ -863,7 +1249,7 @@ def add_comment():
     if len(comment_text) > 2000:
         return jsonify({'error': 'Comment too long (max 2000 characters)'}), 400
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     try:
@@ -891,8 +1277,6 @@ def add_comment():
         })
     except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 @app.route('/api/comments/<int:comment_id>', methods=['PUT'])
@@ -908,7 +1292,7 @@ def edit_comment(comment_id):
     if len(comment_text) > 2000:
         return jsonify({'error': 'Comment too long (max 2000 characters)'}), 400
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     # Check ownership
@@ -916,11 +1300,9 @@ def edit_comment(comment_id):
     row = cursor.fetchone()
 
     if not row:
-        conn.close()
         return jsonify({'error': 'Comment not found'}), 404
 
     if row[0] != current_user.id:
-        conn.close()
         return jsonify({'error': 'Not authorized to edit this comment'}), 403
 
     try:
@@ -934,15 +1316,13 @@ def edit_comment(comment_id):
         return jsonify({'success': True, 'message': 'Comment updated'})
     except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 @app.route('/api/comments/<int:comment_id>', methods=['DELETE'])
 @login_required
 def delete_comment(comment_id):
     """Delete a comment (owner only)."""
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     # Check ownership
@@ -950,11 +1330,9 @@ def delete_comment(comment_id):
     row = cursor.fetchone()
 
     if not row:
-        conn.close()
         return jsonify({'error': 'Comment not found'}), 404
 
     if row[0] != current_user.id:
-        conn.close()
         return jsonify({'error': 'Not authorized to delete this comment'}), 403
 
     try:
@@ -964,8 +1342,6 @@ def delete_comment(comment_id):
         return jsonify({'success': True, 'message': 'Comment deleted'})
     except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 # ==========================================
@@ -982,29 +1358,25 @@ def track_stream(episode_id):
     valid_podcasts = {'TMA': 'TMA', 'Balloon Party': 'Balloon', 'The Tim McKernan Show': 'TMShow'}
     table_name = valid_podcasts.get(podcast_name, 'TMA')
 
-    conn = sqlite3.connect(db_path)
+    conn = get_read_db()
     cursor = conn.cursor()
 
-    try:
-        # Increment streams_count
-        cursor.execute(f'''
-            UPDATE {table_name}
-            SET streams_count = COALESCE(streams_count, 0) + 1
-            WHERE id = ?
-        ''', (episode_id,))
-        conn.commit()
+    listener = listener_key(
+        current_user.id if current_user.is_authenticated else None,
+        get_remote_address(),
+        request.headers.get('User-Agent')
+    )
 
-        # Get updated count
-        cursor.execute(f'SELECT streams_count FROM {table_name} WHERE id = ?', (episode_id,))
-        result = cursor.fetchone()
-        streams_count = result[0] if result else 0
+    try:
+        if recent_plays.seen(listener, table_name, episode_id):
+            streams_count = stream_counter.estimate(cursor, table_name, episode_id)
+            return jsonify({'success': True, 'streams_count': streams_count or 0, 'counted': False})
 
-        return jsonify({'success': True, 'streams_count': streams_count})
-    except Exception as e:
-        conn.rollback()
+        # Buffered; the flusher writes accumulated plays every few seconds
+        streams_count = stream_counter.increment(cursor, table_name, episode_id)
+        return jsonify({'success': True, 'streams_count': streams_count or 0, 'counted': True})
+    except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 # ==========================================
@@ -1018,7 +1390,7 @@ def toggle_like(episode_id):
     """Toggle like on an episode."""
     podcast_name = request.args.get('podcast_name', 'TMA')
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     # Check if already liked
@@ -1060,8 +1432,6 @@ def toggle_like(episode_id):
         })
     except sqlite3.Error as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 @app.route('/api/likes/<int:episode_id>/status', methods=['GET'])
@@ -1072,7 +1442,7 @@ def get_like_status(episode_id):
     if not current_user.is_authenticated:
         return jsonify({'is_liked': False, 'likes_count': 0})
 
-    conn = sqlite3.connect(db_path)
+    conn = get_db()
     cursor = conn.cursor()
 
     # Check if liked
@@ -1087,7 +1457,6 @@ def get_like_status(episode_id):
     row = cursor.fetchone()
     likes_count = row[0] if row else 0
 
-    conn.close()
     return jsonify({'is_liked': is_liked, 'likes_count': likes_count})
 
 
@@ -1095,8 +1464,7 @@ def get_like_status(episode_id):
 @login_required
 def get_user_likes():
     """Get all episodes liked by current user."""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -1121,7 +1489,6 @@ def get_user_likes():
             'mp3url': row['mp3url']
         })
 
-    conn.close()
     return jsonify({'likes': likes, 'count': len(likes)})
 
 
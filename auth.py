@@ -4,23 +4,13 @@ Authentication Routes for TMASearcher
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 import bcrypt
-import sqlite3
-import os
 from datetime import datetime
 
 from forms import LoginForm, SignupForm, ChangePasswordForm
+from db import get_db
 
 auth_bp = Blueprint('auth', __name__)
 
-DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
-
-
-def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 
 def get_user_by_id(user_id):
     """Get user by ID."""
@@ -28,7 +18,6 @@ def get_user_by_id(user_id):
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
     user = cursor.fetchone()
-    conn.close()
     return user
 
 
@@ -38,7 +27,6 @@ def get_user_by_email(email):
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users WHERE LOWER(email) = LOWER(?)', (email,))
     user = cursor.fetchone()
-    conn.close()
     return user
 
 
@@ -54,7 +42,6 @@ def create_user(username, email, password):
     ''', (username, email, password_hash, datetime.now().isoformat()))
     user_id = cursor.lastrowid
     conn.commit()
-    conn.close()
 
     return user_id
 
@@ -71,7 +58,6 @@ def update_last_login(user_id):
     cursor.execute('UPDATE users SET last_login = ? WHERE id = ?',
                    (datetime.now().isoformat(), user_id))
     conn.commit()
-    conn.close()
 
 
 def get_user_stats(user_id):
@@ -91,8 +77,6 @@ def get_user_stats(user_id):
     cursor.execute('SELECT COUNT(*) as count FROM episode_likes WHERE user_id = ?', (user_id,))
     likes_count = cursor.fetchone()['count']
 
-    conn.close()
-
     return {
         'favorites': favorites_count,
         'comments': comments_count,
@@ -220,7 +204,6 @@ def change_password():
             cursor.execute('UPDATE users SET password_hash = ? WHERE id = ?',
                           (new_hash, current_user.id))
             conn.commit()
-            conn.close()
 
             flash('Your password has been updated.', 'success')
             return redirect(url_for('auth.profile'))
@@ -0,0 +1,180 @@
+"""
+Database Connections for TMASearcher
+One place that opens SQLite connections, so every connection gets the same
+pragmas: WAL journaling (readers never block the scrapers' writes),
+synchronous=NORMAL, a memory-mapped read path, a larger page cache and a
+busy timeout instead of immediate "database is locked" errors.
+
+Public read endpoints use get_read_db(), a read-only connection that can also
+point at a snapshot copy (DATABASE_SNAPSHOT) refreshed in the background, so
+read traffic and the writers never wait on each other.
+"""
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
+
+# Optional snapshot copy for read-only connections, refreshed every
+# DATABASE_SNAPSHOT_INTERVAL seconds. Unset means reads use the live database.
+SNAPSHOT_PATH = os.environ.get('DATABASE_SNAPSHOT')
+SNAPSHOT_INTERVAL = int(os.environ.get('DATABASE_SNAPSHOT_INTERVAL', '60'))
+
+BUSY_TIMEOUT_MS = 5000
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+    "PRAGMA cache_size = -16000",  # 16 MB
+    "PRAGMA temp_store = MEMORY",
+]
+
+# journal_mode and synchronous need write access, so read-only connections skip them
+READ_PRAGMAS = [pragma for pragma in PRAGMAS if 'journal_mode' not in pragma and 'synchronous' not in pragma]
+READ_PRAGMAS.append("PRAGMA query_only = ON")
+
+_local = threading.local()
+
+
+def connect(path=None, row_factory=None):
+    """Open a new connection with the shared pragmas applied.
+
+    Scripts that run once (scrapers, migrations) use this directly; the web
+    app goes through get_db() so connections are reused.
+    """
+    conn = sqlite3.connect(path or DATABASE_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def connect_readonly(path=None, row_factory=None):
+    """Open a read-only (mode=ro, query_only) connection."""
+    path = os.path.abspath(path or DATABASE_PATH)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_db():
+    """Connection for the current thread, opened on first use and then reused.
+
+    Rows come back as sqlite3.Row, which supports both index and name access.
+    Callers must not close it; release_db() cleans up after each request.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = connect(row_factory=sqlite3.Row)
+        _local.conn = conn
+    return conn
+
+
+def _snapshot_version():
+    """Modification time of the snapshot file, or None if there is none yet."""
+    try:
+        return os.stat(SNAPSHOT_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_read_db():
+    """Read-only connection for the current thread, for routes that never write.
+
+    Uses the snapshot when one is configured and exists, otherwise the live
+    database. A refreshed snapshot replaces the file, so the connection is
+    reopened when the file's version changes.
+    """
+    version = _snapshot_version() if SNAPSHOT_PATH else None
+    conn = getattr(_local, 'read_conn', None)
+    if conn is not None and getattr(_local, 'read_version', None) != version:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = connect_readonly(SNAPSHOT_PATH if version is not None else None, row_factory=sqlite3.Row)
+        _local.read_conn = conn
+        _local.read_version = version
+    return conn
+
+
+def refresh_snapshot(source=None, target=None):
+    """Copy the live database to the snapshot path with the backup API.
+
+    The copy is written to a temporary file named for this process and
+    swapped in with os.replace, so readers never see a half-written snapshot.
+    """
+    target = target or SNAPSHOT_PATH
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    src = connect(source)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst)
+        # A standalone copy has no writers, so it does not need WAL files next to it
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_path, target)
+
+
+def start_snapshot_refresher(interval=None):
+    """Refresh the snapshot now and then every interval seconds in a daemon thread.
+
+    Every WSGI worker starts one, but only the worker holding the snapshot's
+    lock file refreshes it; the others keep trying for the lock, so one of
+    them takes over if that worker exits. Does nothing when DATABASE_SNAPSHOT
+    is not set.
+    """
+    if not SNAPSHOT_PATH:
+        return None
+    interval = interval or SNAPSHOT_INTERVAL
+
+    def run():
+        with open(f"{SNAPSHOT_PATH}.lock", 'a') as lock_file:
+            locked = False
+            while True:
+                try:
+                    if not locked:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        locked = True
+                    refresh_snapshot()
+                except BlockingIOError:
+                    pass  # Another process refreshes the snapshot
+                except (sqlite3.Error, OSError) as e:
+                    logging.error(f"Snapshot refresh failed: {e}")
+                time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='db-snapshot', daemon=True)
+    thread.start()
+    return thread
+
+
+def release_db(exception=None):
+    """Roll back anything a request left uncommitted on its thread's connections.
+
+    Registered with app.teardown_appcontext so a failed request cannot leave
+    a write transaction (and its lock) open on the reused connection, and a
+    read transaction cannot pin an old WAL snapshot.
+    """
+    for name in ('conn', 'read_conn'):
+        conn = getattr(_local, name, None)
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+
+
+def close_db():
+    """Close the current thread's connections, if it has any."""
+    for name in ('conn', 'read_conn'):
+        conn = getattr(_local, name, None)
+        if conn is not None:
+            conn.close()
+            setattr(_local, name, None)
@@ -4,17 +4,8 @@ Authentication Forms for TMASearcher
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Regexp
-import sqlite3
-import os
 
-DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
-
-
-def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+from db import get_db
 
 
 class LoginForm(FlaskForm):
@@ -57,7 +48,6 @@ class SignupForm(FlaskForm):
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM users WHERE LOWER(username) = LOWER(?)', (field.data,))
         user = cursor.fetchone()
-        conn.close()
         if user:
             raise ValidationError('Username is already taken')
 
@@ -67,7 +57,6 @@ class SignupForm(FlaskForm):
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM users WHERE LOWER(email) = LOWER(?)', (field.data,))
         user = cursor.fetchone()
-        conn.close()
         if user:
             raise ValidationError('Email is already registered')
 
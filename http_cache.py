@@ -0,0 +1,128 @@
+"""
+HTTP Caching for TMASearcher
+Conditional GET support for the read APIs. Validators come from the per-table
+generation counters (see migrate_table_generations.py), so a request whose
+If-None-Match or If-Modified-Since still holds gets a 304 after a single
+lookup in table_generations, without touching the episode tables.
+
+cached_response() additionally keeps whole response bodies for hot endpoints
+in the in-process ResponseCache, keyed on the endpoint and its arguments.
+"""
+import hashlib
+from datetime import date, datetime, timezone
+from functools import wraps
+
+from flask import g, request, make_response
+
+from db import get_read_db
+from query_cache import get_generations, response_cache
+
+# Tables behind the episode counters (comments_count, favorites_count, likes_count)
+COUNTER_TABLES = ['comments', 'user_favorites', 'episode_likes']
+
+
+def table_versions(names):
+    """get_generations() for this request's tables, looked up once per request."""
+    cached = g.get('table_versions')
+    if cached is not None and cached[0] == tuple(names):
+        return cached[1]
+    versions = get_generations(get_read_db().cursor(), names)
+    g.table_versions = (tuple(names), versions)
+    return versions
+
+
+def _last_modified(versions):
+    """Latest updated_at among the tables, as an aware UTC datetime."""
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    if not stamps:
+        return None
+    return datetime.strptime(max(stamps), '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+
+def conditional_get(tables, max_age=0):
+    """Decorator adding ETag/Last-Modified validators and 304 responses to a GET route.
+
+    tables is a list of table names, or a function taking the view's
+    arguments and returning one (None skips caching, e.g. for a bad podcast
+    name). max_age=0 lets browsers and proxies store responses but makes
+    them revalidate on every use.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            names = tables(*args, **kwargs) if callable(tables) else tables
+            if request.method != 'GET' or not names:
+                return f(*args, **kwargs)
+
+            versions = table_versions(names)
+            if versions is None:
+                return f(*args, **kwargs)
+
+            # The same URL renders the same body for the same generations on the
+            # same day (date windows like "last 90 days" move at midnight)
+            key = '|'.join([
+                request.full_path,
+                date.today().isoformat(),
+                ','.join(f"{name}:{versions[name][0]}" for name in names)
+            ])
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+            last_modified = _last_modified(versions)
+
+            not_modified = False
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif request.if_modified_since and last_modified:
+                not_modified = last_modified <= request.if_modified_since
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            if max_age == 0:
+                response.cache_control.must_revalidate = True
+            return response
+        return decorated_function
+    return decorator
+
+
+def cached_response(tables):
+    """Decorator serving a GET route from the in-process response cache.
+
+    tables works as for conditional_get(); they become the entry's tags, and
+    the entry is dropped once any of their generations changes. Only 200
+    responses are stored. Place it below conditional_get() so 304s are still
+    answered first.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            names = tables(*args, **kwargs) if callable(tables) else tables
+            if request.method != 'GET' or not names:
+                return f(*args, **kwargs)
+
+            versions = table_versions(names)
+            if versions is None:
+                return f(*args, **kwargs)
+
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), date.today().isoformat())
+            generations = tuple(versions[name][0] for name in names)
+            cached = response_cache.get(key, generations)
+            if cached is not None:
+                body, mimetype = cached
+                return make_response(body, 200, {'Content-Type': mimetype})
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                body = response.get_data()
+                response_cache.set(key, names, generations, (body, response.content_type), len(body))
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Keyset Pagination
+Adds the indexes that let cursor pages seek straight to their first row.
+
+Usage:
+    python migrate_keyset_indexes.py [--dry-run]
+
+Options:
+    --dry-run    Print SQL statements without executing them
+"""
+
+import sqlite3
+import sys
+import os
+from datetime import datetime
+
+# Database path
+DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
+
+# Every index ends in the rowid, so (DATE, ID) and (metric, DATE, ID) seeks
+# and their DESC scans are served by the index alone.
+CREATE_INDEXES_SQL = {
+    'TMA': [
+        "CREATE INDEX IF NOT EXISTS idx_tma_date ON TMA(DATE);",
+        "CREATE INDEX IF NOT EXISTS idx_tma_likes_date ON TMA(likes_count, DATE);",
+        "CREATE INDEX IF NOT EXISTS idx_tma_favorites_date ON TMA(favorites_count, DATE);",
+        "CREATE INDEX IF NOT EXISTS idx_tma_comments_date ON TMA(comments_count, DATE);",
+        "CREATE INDEX IF NOT EXISTS idx_tma_streams_date ON TMA(streams_count, DATE);",
+    ],
+    'TMShow': [
+        "CREATE INDEX IF NOT EXISTS idx_tmshow_date ON TMShow(DATE);",
+    ],
+    'Balloon': [
+        "CREATE INDEX IF NOT EXISTS idx_balloon_date ON Balloon(DATE);",
+    ],
+    'TMA_Archive': [
+        "CREATE INDEX IF NOT EXISTS idx_tma_archive_date ON TMA_Archive(date);",
+    ],
+}
+
+
+def table_exists(cursor, table):
+    """Check if a table exists."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+
+def run_migration(dry_run=False):
+    """Run the database migration."""
+    print(f"Database Migration for Keyset Pagination")
+    print(f"=" * 50)
+    print(f"Database: {DATABASE_PATH}")
+    print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+    print(f"Time: {datetime.now().isoformat()}")
+    print()
+
+    if not os.path.exists(DATABASE_PATH):
+        print(f"ERROR: Database file not found: {DATABASE_PATH}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        print("Step 1: Creating pagination indexes...")
+        for table, statements in CREATE_INDEXES_SQL.items():
+            if not table_exists(cursor, table):
+                print(f"  - Skipping {table} (table does not exist)")
+                continue
+
+            for sql in statements:
+                if dry_run:
+                    print(f"  SQL: {sql}")
+                else:
+                    cursor.execute(sql)
+                    print(f"  - Executed: {sql[:60]}...")
+        print()
+
+        # Commit changes
+        if not dry_run:
+            cursor.execute("ANALYZE")
+            conn.commit()
+            print("Migration completed successfully!")
+        else:
+            print("Dry run completed. No changes made.")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"ERROR: Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv
+    run_migration(dry_run)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Full-Text Search
+Creates an FTS5 index for each podcast table (and the TMA archive) and the triggers that keep it in sync.
+
+Run this as part of every deploy (it is safe to re-run). Until a table has
+its index, /search and /search_archive answer text searches with slow LIKE
+scans and cannot sort by relevance. Episode tables created later by the
+scrapers (scrapers/store.py) only get an index once they are added to
+SEARCH_TABLES below and this script runs again.
+
+Each index is keyed on its table's INTEGER PRIMARY KEY, which VACUUM never
+renumbers. TMA_Archive has none, so it is first rebuilt with an id column
+holding its current rowids; anything that inserts into it must name its
+columns from then on.
+
+Usage:
+    python migrate_search_index.py [--dry-run]
+
+Options:
+    --dry-run    Print SQL statements without executing them
+"""
+
+import sqlite3
+import sys
+import os
+from datetime import datetime
+
+# Database path
+DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
+
+# Tables that get a <table>_fts index: table -> (key column, indexed columns)
+SEARCH_TABLES = {
+    'TMA': ('ID', ['TITLE', 'SHOW_NOTES']),
+    'TMShow': ('ID', ['TITLE', 'SHOW_NOTES']),
+    'Balloon': ('ID', ['TITLE', 'SHOW_NOTES']),
+    'TMA_Archive': ('id', ['filename']),
+}
+
+# Tables rebuilt to add their key column as an INTEGER PRIMARY KEY
+ADD_KEY_TABLES = ['TMA_Archive']
+
+
+def normalize_sql(expr):
+    """SQL expression that maps straight/left quotes to the right single quote."""
+    return f"REPLACE(REPLACE({expr}, '''', '’'), '‘', '’')"
+
+
+def create_index_sql(table):
+    """FTS5 table and sync triggers for one searchable table.
+
+    The trigram tokenizer keeps substring matching identical to the old
+    LIKE '%word%' search, and apostrophes are normalized as rows are indexed
+    so queries never have to rewrite the stored text.
+    """
+    fts = f'{table}_fts'
+    key, columns = SEARCH_TABLES[table]
+    column_list = ', '.join(columns)
+    new_values = ', '.join(normalize_sql(f'NEW.{column}') for column in columns)
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    {column_list},
+    tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.{key}, {new_values});
+END;
+
+CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+BEGIN
+    DELETE FROM {fts} WHERE rowid = OLD.{key};
+END;
+
+CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column_list} ON {table}
+BEGIN
+    DELETE FROM {fts} WHERE rowid = OLD.{key};
+    INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.{key}, {new_values});
+END;
+"""
+
+
+def populate_index_sql(table):
+    """Statements that (re)load an FTS index from its source table."""
+    fts = f'{table}_fts'
+    key, columns = SEARCH_TABLES[table]
+    column_list = ', '.join(columns)
+    values = ', '.join(normalize_sql(column) for column in columns)
+    return [
+        f"DELETE FROM {fts};",
+        f"INSERT INTO {fts} (rowid, {column_list}) SELECT {key}, {values} FROM {table};",
+        f"INSERT INTO {fts} ({fts}) VALUES ('optimize');",
+    ]
+
+
+def add_key_sql(cursor, table):
+    """Statements that rebuild a table with its FTS key as an INTEGER PRIMARY KEY.
+
+    The key is filled from the current rowids, so existing cursors and links
+    keep working. The table's own indexes and triggers are recreated after
+    the rebuild; its FTS triggers are left to create_index_sql().
+    """
+    key, _ = SEARCH_TABLES[table]
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    create_sql = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL AND name NOT LIKE ?",
+        (table, f'{table}_fts_%')
+    )
+    dependents = [row[0] + ';' for row in cursor.fetchall()]
+    cursor.execute(f"PRAGMA table_info({table})")
+    column_list = ', '.join(row[1] for row in cursor.fetchall())
+
+    columns_sql = create_sql[create_sql.index('(') + 1:]
+    return [
+        f"CREATE TABLE {table}_new ({key} INTEGER PRIMARY KEY, {columns_sql};",
+        f"INSERT INTO {table}_new ({key}, {column_list}) SELECT rowid, {column_list} FROM {table};",
+        f"DROP TABLE {table};",
+        f"ALTER TABLE {table}_new RENAME TO {table};",
+        *dependents,
+    ]
+
+
+def column_exists(cursor, table, column):
+    """Check if a column exists in a table."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def table_exists(cursor, table):
+    """Check if a table exists."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+
+def run_migration(dry_run=False):
+    """Run the database migration."""
+    print(f"Database Migration for Full-Text Search")
+    print(f"=" * 50)
+    print(f"Database: {DATABASE_PATH}")
+    print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+    print(f"Time: {datetime.now().isoformat()}")
+    print()
+
+    if not os.path.exists(DATABASE_PATH):
+        print(f"ERROR: Database file not found: {DATABASE_PATH}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Step 1: Give tables without one a stable key column
+        print("Step 1: Adding key columns...")
+        for table in ADD_KEY_TABLES:
+            key, _ = SEARCH_TABLES[table]
+            if not table_exists(cursor, table):
+                print(f"  - Skipping {table} (table does not exist)")
+                continue
+            if column_exists(cursor, table, key):
+                print(f"  - Skipping {table}.{key} (already exists)")
+                continue
+
+            statements = add_key_sql(cursor, table)
+            if dry_run:
+                for sql in statements:
+                    print(f"  SQL: {sql}")
+            else:
+                cursor.execute("BEGIN")
+                for sql in statements:
+                    cursor.execute(sql)
+                conn.commit()
+                print(f"  - Rebuilt {table} with {key} INTEGER PRIMARY KEY")
+        print()
+
+        # Step 2: Create FTS tables and triggers
+        print("Step 2: Creating FTS5 indexes and triggers...")
+        for table in SEARCH_TABLES:
+            if not table_exists(cursor, table):
+                print(f"  - Skipping {table} (table does not exist)")
+                continue
+
+            sql = create_index_sql(table)
+            if dry_run:
+                print(sql)
+            else:
+                cursor.executescript(sql)
+                print(f"  - Created {table}_fts with insert/update/delete triggers")
+        print()
+
+        # Step 3: Load existing rows into the indexes
+        print("Step 3: Populating FTS5 indexes...")
+        for table in SEARCH_TABLES:
+            if not table_exists(cursor, table):
+                continue
+
+            for sql in populate_index_sql(table):
+                if dry_run:
+                    print(f"  SQL: {sql}")
+                else:
+                    cursor.execute(sql)
+            if not dry_run:
+                cursor.execute(f"SELECT COUNT(*) FROM {table}_fts")
+                print(f"  - Indexed {cursor.fetchone()[0]} rows into {table}_fts")
+        print()
+
+        # Commit changes
+        if not dry_run:
+            conn.commit()
+            print("Migration completed successfully!")
+        else:
+            print("Dry run completed. No changes made.")
+
+        # Verify tables
+        print()
+        print("Verification:")
+        for table in SEARCH_TABLES:
+            exists = table_exists(cursor, f'{table}_fts')
+            print(f"  - {table}_fts: {'EXISTS' if exists else 'MISSING'}")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"ERROR: Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv
+    run_migration(dry_run)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Spotify Links
+Adds a spotify_url column to each podcast table and links the episodes
+already stored in the *Spot tables. Linking matches on the title_key
+column, so run migrate_title_keys.py first.
+
+Usage:
+    python migrate_spotify_links.py [--dry-run]
+
+Options:
+    --dry-run    Print SQL statements without executing them
+"""
+
+import sqlite3
+import sys
+import os
+from datetime import datetime
+
+from spotify_links import SPOTIFY_TABLES, link_spotify_table
+
+# Database path
+DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
+
+# SQL for adding the link column, its lookup index and a DATE index for the match window
+ALTER_EPISODE_TABLES_SQL = {
+    table: [
+        f"ALTER TABLE {table} ADD COLUMN spotify_url TEXT;",
+        f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_spotify_url ON {table}(spotify_url);",
+        f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_date ON {table}(DATE);",
+    ]
+    for table in SPOTIFY_TABLES
+}
+
+
+def column_exists(cursor, table, column):
+    """Check if a column exists in a table."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+    return column in columns
+
+
+def table_exists(cursor, table):
+    """Check if a table exists."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+
+def run_migration(dry_run=False):
+    """Run the database migration."""
+    print(f"Database Migration for Spotify Links")
+    print(f"=" * 50)
+    print(f"Database: {DATABASE_PATH}")
+    print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+    print(f"Time: {datetime.now().isoformat()}")
+    print()
+
+    if not os.path.exists(DATABASE_PATH):
+        print(f"ERROR: Database file not found: {DATABASE_PATH}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.cursor()
+
+    missing = [table for table in SPOTIFY_TABLES
+               if table_exists(cursor, table) and not column_exists(cursor, table, 'title_key')]
+    if missing:
+        print(f"ERROR: {', '.join(missing)} has no title_key column. Run migrate_title_keys.py first.")
+        conn.close()
+        sys.exit(1)
+
+    try:
+        # Step 1: Add spotify_url columns
+        print("Step 1: Adding spotify_url column to episode tables...")
+        for table, statements in ALTER_EPISODE_TABLES_SQL.items():
+            if not table_exists(cursor, table):
+                print(f"  - Skipping {table} (table does not exist)")
+                continue
+
+            for sql in statements:
+                if 'ADD COLUMN' in sql and column_exists(cursor, table, 'spotify_url'):
+                    print(f"  - Skipping {table}.spotify_url (already exists)")
+                    continue
+
+                if dry_run:
+                    print(f"  SQL: {sql}")
+                else:
+                    cursor.execute(sql)
+                    print(f"  - Executed: {sql[:60]}...")
+        print()
+
+        # Step 2: Link the Spotify episodes we already have
+        print("Step 2: Linking stored Spotify episodes...")
+        for table, spot_table in SPOTIFY_TABLES.items():
+            if not table_exists(cursor, table) or not table_exists(cursor, spot_table):
+                print(f"  - Skipping {table} ({spot_table} or {table} does not exist)")
+                continue
+
+            if dry_run:
+                print(f"  - Would link {table} episodes from {spot_table}")
+            else:
+                linked = link_spotify_table(cursor, table)
+                print(f"  - Linked {linked} {table} episodes from {spot_table}")
+        print()
+
+        # Commit changes
+        if not dry_run:
+            conn.commit()
+            print("Migration completed successfully!")
+        else:
+            print("Dry run completed. No changes made.")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"ERROR: Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv
+    run_migration(dry_run)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Table Generations
+Adds a per-table generation counter that triggers bump on every content
+change, so in-process caches and HTTP validators (ETag/Last-Modified) in the
+web app can tell when their data is stale no matter which process (scraper,
+admin page, API) made the write.
+
+Usage:
+    python migrate_table_generations.py [--dry-run]
+
+Options:
+    --dry-run    Print SQL statements without executing them
+"""
+
+import sqlite3
+import sys
+import os
+from datetime import datetime
+
+# Database path
+DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS table_generations (
+    table_name TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Tracked table -> columns whose updates change what the site shows.
+# Counter columns (likes_count etc.) are left out on purpose; the episode
+# counters follow writes to comments, user_favorites and episode_likes, which
+# are tracked themselves.
+TRACKED_TABLES = {
+    'TMA': ['TITLE', 'DATE', 'URL', 'SHOW_NOTES', 'mp3url'],
+    'TMShow': ['TITLE', 'DATE', 'URL', 'SHOW_NOTES', 'mp3url'],
+    'Balloon': ['TITLE', 'DATE', 'URL', 'SHOW_NOTES', 'mp3url'],
+    'TMA_Archive': ['filename', 'date', 'mp3url'],
+    'comments': ['comment_text', 'timestamp_ref', 'is_edited', 'likes_count'],
+    'user_favorites': ['podcast_name', 'episode_id'],
+    'episode_likes': ['podcast_name', 'episode_id'],
+}
+
+
+def bump_sql(table):
+    """Statement run by the triggers to advance a table's generation."""
+    return f"""INSERT INTO table_generations (table_name, generation) VALUES ('{table}', 1)
+    ON CONFLICT(table_name) DO UPDATE SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP;"""
+
+
+def create_triggers_sql(table, columns):
+    """Insert/update/delete triggers that bump a table's generation."""
+    return f"""
+CREATE TRIGGER IF NOT EXISTS bump_generation_{table.lower()}_insert AFTER INSERT ON {table}
+BEGIN
+    {bump_sql(table)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bump_generation_{table.lower()}_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+BEGIN
+    {bump_sql(table)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bump_generation_{table.lower()}_delete AFTER DELETE ON {table}
+BEGIN
+    {bump_sql(table)}
+END;
+"""
+
+
+def table_exists(cursor, table):
+    """Check if a table exists."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+
+def run_migration(dry_run=False):
+    """Run the database migration."""
+    print(f"Database Migration for Table Generations")
+    print(f"=" * 50)
+    print(f"Database: {DATABASE_PATH}")
+    print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+    print(f"Time: {datetime.now().isoformat()}")
+    print()
+
+    if not os.path.exists(DATABASE_PATH):
+        print(f"ERROR: Database file not found: {DATABASE_PATH}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Step 1: Create the generations table
+        print("Step 1: Creating table_generations...")
+        if dry_run:
+            print(CREATE_TABLE_SQL)
+        else:
+            cursor.executescript(CREATE_TABLE_SQL)
+            print("  - Created table_generations table")
+        print()
+
+        # Step 2: Create triggers
+        print("Step 2: Creating generation triggers...")
+        for table, columns in TRACKED_TABLES.items():
+            if not table_exists(cursor, table):
+                print(f"  - Skipping {table} (table does not exist)")
+                continue
+
+            sql = create_triggers_sql(table, columns)
+            if dry_run:
+                print(sql)
+            else:
+                cursor.executescript(sql)
+                print(f"  - Created {table} generation triggers")
+        print()
+
+        # Commit changes
+        if not dry_run:
+            conn.commit()
+            print("Migration completed successfully!")
+        else:
+            print("Dry run completed. No changes made.")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"ERROR: Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv
+    run_migration(dry_run)
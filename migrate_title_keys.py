@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Title Keys
+Adds a title_key column (titles.normalize_title of the title) to every
+episode table, fills it in for existing rows, and indexes it with the date,
+so RSS and Spotify matching can seek on (date, title_key).
+
+Safe to re-run: rows whose key is missing or out of date are recomputed,
+which is also how to backfill after a change to normalize_title().
+
+Usage:
+    python migrate_title_keys.py [--dry-run]
+
+Options:
+    --dry-run    Print SQL statements without executing them
+"""
+
+import sqlite3
+import sys
+import os
+from datetime import datetime
+
+from titles import TITLE_KEY_TABLES, normalize_title, title_key_index_sql
+
+# Database path
+DATABASE_PATH = os.environ.get('DATABASE_URL', 'TMASTL.db')
+
+
+def table_exists(cursor, table):
+    """Check if a table exists."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+
+def column_exists(cursor, table, column):
+    """Check if a column exists in a table."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def stale_title_keys(cursor, table):
+    """(title_key, rowid) for every row whose stored key is missing or out of date."""
+    title_column = TITLE_KEY_TABLES[table][0]
+    cursor.execute(f"SELECT rowid, {title_column}, title_key FROM {table}")
+    return [
+        (normalize_title(title), rowid)
+        for rowid, title, title_key in cursor.fetchall()
+        if title is not None and normalize_title(title) != title_key
+    ]
+
+
+def run_migration(dry_run=False):
+    """Run the database migration."""
+    print(f"Database Migration for Title Keys")
+    print(f"=" * 50)
+    print(f"Database: {DATABASE_PATH}")
+    print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+    print(f"Time: {datetime.now().isoformat()}")
+    print()
+
+    if not os.path.exists(DATABASE_PATH):
+        print(f"ERROR: Database file not found: {DATABASE_PATH}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.cursor()
+
+    try:
+        tables = [table for table in TITLE_KEY_TABLES if table_exists(cursor, table)]
+        for table in TITLE_KEY_TABLES:
+            if table not in tables:
+                print(f"  - Skipping {table} (table does not exist)")
+        print()
+
+        print("Step 1: Adding title_key columns...")
+        for table in tables:
+            if column_exists(cursor, table, 'title_key'):
+                print(f"  - {table}.title_key already exists")
+                continue
+            sql = f"ALTER TABLE {table} ADD COLUMN title_key TEXT;"
+            if dry_run:
+                print(f"  SQL: {sql}")
+            else:
+                cursor.execute(sql)
+                print(f"  - Added {table}.title_key")
+        print()
+
+        print("Step 2: Backfilling title keys...")
+        for table in tables:
+            if dry_run and not column_exists(cursor, table, 'title_key'):
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                print(f"  - {table}: {cursor.fetchone()[0]} rows would be filled in")
+                continue
+            updates = stale_title_keys(cursor, table)
+            if dry_run:
+                print(f"  - {table}: {len(updates)} rows would be updated")
+            else:
+                cursor.executemany(f"UPDATE {table} SET title_key = ? WHERE rowid = ?", updates)
+                print(f"  - {table}: {len(updates)} rows updated")
+        print()
+
+        print("Step 3: Creating (date, title_key) indexes...")
+        for table in tables:
+            sql = title_key_index_sql(table)
+            if dry_run:
+                print(f"  SQL: {sql}")
+            else:
+                cursor.execute(sql)
+                print(f"  - Executed: {sql[:60]}...")
+        print()
+
+        # Commit changes
+        if not dry_run:
+            cursor.execute("ANALYZE")
+            conn.commit()
+            print("Migration completed successfully!")
+        else:
+            print("Dry run completed. No changes made.")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"ERROR: Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv
+    run_migration(dry_run)
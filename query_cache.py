@@ -0,0 +1,190 @@
+"""
+Query Caches for TMASearcher
+In-process caches keyed on the per-table generation counters kept by the
+triggers from migrate_table_generations.py. A write to a table advances its
+generation, so entries built from older data simply stop being looked up.
+
+ResponseCache holds whole rendered responses for hot endpoints, tagged with
+the tables they read, and drops them as soon as any tag's generation moves.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def get_generation(cursor, table_name):
+    """Current generation of a table, or None if generations are not set up."""
+    try:
+        cursor.execute("SELECT generation FROM table_generations WHERE table_name = ?", (table_name,))
+    except sqlite3.OperationalError:
+        return None
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def get_generations(cursor, table_names):
+    """(generation, updated_at) for each table, or None if generations are not set up.
+
+    Tables that have never been written since the migration report (0, None).
+    """
+    placeholders = ', '.join('?' for _ in table_names)
+    try:
+        cursor.execute(
+            f"SELECT table_name, generation, updated_at FROM table_generations WHERE table_name IN ({placeholders})",
+            list(table_names)
+        )
+    except sqlite3.OperationalError:
+        return None
+    found = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    return {name: found.get(name, (0, None)) for name in table_names}
+
+
+def bump_generation(cursor, table_name):
+    """Advance a generation by hand, for writes no trigger sees.
+
+    Used for pseudo-tables such as 'streams' (batched stream counts). Does
+    nothing if generations are not set up.
+    """
+    try:
+        cursor.execute('''
+            INSERT INTO table_generations (table_name, generation) VALUES (?, 1)
+            ON CONFLICT(table_name) DO UPDATE SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+        ''', (table_name,))
+    except sqlite3.OperationalError:
+        pass
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_count_cache = LRUCache(max_entries=512, ttl=300)
+
+
+def cached_count(cursor, table_name, where_clause, params, from_clause=None):
+    """COUNT(*) of a filtered query, reused until the table's generation changes.
+
+    from_clause defaults to the table itself; pass it when the count joins
+    other tables (for example an FTS score join).
+    """
+    from_clause = from_clause or table_name
+    query = f"SELECT COUNT(*) FROM {from_clause} WHERE {where_clause}"
+
+    generation = get_generation(cursor, table_name)
+    if generation is None:
+        cursor.execute(query, params)
+        return cursor.fetchone()[0]
+
+    key = (table_name, generation, re.sub(r'\s+', ' ', f"{from_clause} WHERE {where_clause}").strip(), tuple(params))
+    total = _count_cache.get(key)
+    if total is None:
+        cursor.execute(query, params)
+        total = cursor.fetchone()[0]
+        _count_cache.set(key, total)
+    return total
+
+
+class ResponseCache:
+    """LRU cache of response bodies, bounded by entry count and total bytes.
+
+    Each entry remembers the generations of its tags (table names) when it
+    was stored and is only served while they are unchanged, so writes from
+    any process invalidate it. invalidate(tag) drops entries immediately for
+    writes made in this process.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tags, generations, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, generations):
+        """Cached value if it was stored under the same tag generations, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] < time.monotonic() or entry[2] != generations):
+                self._remove(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def set(self, key, tags, generations, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tags), generations, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tag):
+        """Drop every entry tagged with tag."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if tag in entry[1]]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        """Called with self._lock held."""
+        self._bytes -= self._entries.pop(key)[4]
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,68 @@
+"""
+RSS Reconciliation for TMASearcher
+Matches megaphone feed entries to stored episodes by (date, normalized
+title) and fills in missing mp3 URLs. The episodes for the feed's whole date
+span are loaded with one query into a dict, so every entry is a dict lookup
+instead of its own table scan. Stored titles are compared by their
+title_key column (see titles.py), so only the feed's titles are normalized.
+"""
+from scrapers.rss import iter_items, open_feed
+from titles import normalize_title
+
+
+def reconcile(conn, entries, table_name='TMA'):
+    """Store the mp3 URL of each (title, date, mp3_url) entry on its episode.
+
+    Only episodes without an mp3url are updated, all in one executemany and
+    one transaction. Returns counts of matched, updated and unmatched entries,
+    plus the unmatched entries themselves.
+    """
+    entries = list(entries)
+    result = {'matched': 0, 'updated': 0, 'unmatched': 0, 'unmatched_entries': []}
+    if not entries:
+        return result
+
+    dates = [date for _, date, _ in entries]
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT ID, title_key, DATE, mp3url FROM {table_name} WHERE DATE BETWEEN ? AND ?",
+        (min(dates), max(dates))
+    )
+    episodes = {}
+    for episode_id, title_key, date, mp3_url in cursor.fetchall():
+        # The first of two same-day episodes with one title wins, as it always has
+        episodes.setdefault((date, title_key), (episode_id, mp3_url))
+
+    updates = {}
+    for title, date, mp3_url in entries:
+        match = episodes.get((date, normalize_title(title)))
+        if match is None:
+            result['unmatched'] += 1
+            result['unmatched_entries'].append((title, date, mp3_url))
+            continue
+        result['matched'] += 1
+        episode_id, stored_url = match
+        if not stored_url and mp3_url:
+            updates.setdefault(episode_id, mp3_url)
+
+    with conn:
+        cursor.executemany(
+            f"UPDATE {table_name} SET mp3url = ? WHERE ID = ?",
+            [(mp3_url, episode_id) for episode_id, mp3_url in updates.items()]
+        )
+    result['updated'] = len(updates)
+    return result
+
+
+def reconcile_feed(conn, fetcher, cutoff=None):
+    """Stream the megaphone feed (down to cutoff) and reconcile it.
+
+    Returns reconcile()'s result, or None when the feed has not changed
+    since the fetcher's cache was last saved.
+    """
+    feed = open_feed(fetcher)
+    if feed is None:
+        return None
+    with feed:
+        entries = [(item['title'], item['date'], item['mp3_url']) for item in iter_items(feed.raw, cutoff=cutoff)]
+    return reconcile(conn, entries)
@@ -0,0 +1,10 @@
+"""
+Scrapers for TMASearcher
+One package for every podcast source: configs in sources.py, parsers in
+parsers.py, storage in store.py and the process that runs them in runner.py.
+Run with `python -m scrapers [source ...]`, or keep every source on its
+schedule with `python -m scrapers.scheduler`.
+"""
+from scrapers.fetch import Fetcher, TokenBucket
+from scrapers.sources import SOURCES
+from scrapers.runner import run_sources
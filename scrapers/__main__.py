@@ -0,0 +1,3 @@
+from scrapers.runner import main
+
+main()
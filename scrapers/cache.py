@@ -0,0 +1,102 @@
+"""
+On-disk HTTP Validator Cache for the TMASearcher scrapers
+Remembers the ETag, Last-Modified and a SHA-256 of the body of every page
+the scrapers and RSS scripts fetch, so the next run can send a conditional
+request and skip parsing a page that has not changed. Only the validators
+are kept, not the pages themselves.
+
+New validators are staged in memory and written by save(), which callers
+only do once everything they fetched has been stored; otherwise they
+discard() them. A run that fails part way therefore fetches and parses the
+same pages again next time.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+BASE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.environ.get('SCRAPER_CACHE', os.path.join(BASE_DIRECTORY, 'http_cache.json'))
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+class HTTPCache:
+    """Per-URL ETag/Last-Modified/content hash, loaded from and saved to a JSON file."""
+
+    def __init__(self, path=None):
+        self.path = path or CACHE_PATH
+        self._staged = {}
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable HTTP cache {self.path}: {e}")
+            return {}
+
+    def conditional_headers(self, url):
+        """If-None-Match/If-Modified-Since headers for url, empty when it was never saved."""
+        entry = self._entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def unchanged(self, url, response, hash_body=True):
+        """True for a 304, or a 200 whose body hashes the same as the saved one.
+
+        The hash covers servers that send no validators, like most of the
+        tmastl.com pages: the page is still downloaded, but not parsed again.
+        Streamed responses pass hash_body=False, since hashing reads the body.
+        """
+        if response.status_code == 304:
+            return url in self._entries
+        if response.status_code != 200 or not hash_body:
+            return False
+        digest = content_hash(response.content)
+        if self._entries.get(url, {}).get('sha256') == digest:
+            self.stage(url, response, digest)  # Keep any new validators
+            return True
+        return False
+
+    def stage(self, url, response, digest=None, hash_body=True):
+        """Record a 200 response's validators, to be written by the next save()."""
+        entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': digest or (content_hash(response.content) if hash_body else None),
+        }
+        with self._lock:
+            self._staged[url] = entry
+
+    def discard(self):
+        """Forget the staged validators, so their pages are parsed again next run."""
+        with self._lock:
+            self._staged = {}
+
+    def save(self):
+        """Write the staged validators; the file is swapped in with os.replace.
+
+        The file is read again first, so validators saved by another process
+        since this cache was loaded are kept. Callers save under run_lock().
+        """
+        with self._lock:
+            if not self._staged:
+                return
+            self._entries = {**self._load(), **self._staged}
+            self._staged = {}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,148 @@
+"""
+HTML Extraction for the TMASearcher scrapers
+Pulls the few fields the parsers need out of tmastl.com pages with
+precompiled XPath over lxml.html, instead of building a BeautifulSoup tree
+and running CSS searches on it. BeautifulSoup is only used when lxml is not
+installed. Both paths return the same strings: text is joined the way
+BeautifulSoup's get_text() joins it, leaving out scripts, styles and comments
+and collapsing whitespace-only strings as BeautifulSoup does when it parses.
+"""
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+def has_class(name):
+    """XPath predicate for an element whose class list contains name."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if lxml is not None:
+    TEXT = etree.XPath(".//text()[not(ancestor::script or ancestor::style)]")
+    IN_PRESERVED = etree.XPath("boolean(ancestor-or-self::pre or ancestor-or-self::textarea)")
+
+    # Listing pages with the notes inline (TMShow, Balloon)
+    LISTING_EPISODES = etree.XPath("//div[normalize-space(@class) = 'col-10 px-3 align-self-center']")
+    POST_TITLE_LINK = etree.XPath(f"(.//*[{has_class('post-title')}]//a)[1]")
+    BYLINE_TIME = etree.XPath(f"(.//*[{has_class('byline')}]//time)[1]")
+    CONTENT = etree.XPath(f"(.//*[{has_class('the_content')}])[1]")
+
+    # TMA listing pages and episode pages
+    EPISODE_LINKS = etree.XPath(f"//a[{has_class('episode-link')}]")
+    LINK_TITLE = etree.XPath(f"(.//h6[{has_class('post-title')}])[1]")
+    LINK_TIME = etree.XPath("(.//time)[1]")
+    PAGE_CONTENT = etree.XPath(f"(//div[{has_class('the_content')}])[1]")
+
+    _UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def _document(html):
+    if not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode('utf-8'), parser=_UTF8_PARSER)
+
+
+def _first(xpath, element):
+    found = xpath(element)
+    return found[0] if found else None
+
+
+def _string(node):
+    """A text node as BeautifulSoup stores it.
+
+    BeautifulSoup replaces a string that is only whitespace with a single
+    newline (if it has one) or space, except inside <pre> and <textarea>.
+    """
+    if node.strip():
+        return node
+    parent = node.getparent()
+    if node.is_tail:
+        parent = parent.getparent()
+    if parent is not None and IN_PRESERVED(parent):
+        return node
+    return "\n" if "\n" in node else " "
+
+
+def _text(element, separator=''):
+    return separator.join(_string(node) for node in TEXT(element))
+
+
+def listing_episodes(html):
+    """(title, date text, url, notes text) for each episode on a listing page.
+
+    Yields lazily, so episodes before a malformed one are still returned;
+    a missing field raises AttributeError.
+    """
+    if lxml is None:
+        yield from _soup_listing_episodes(html)
+        return
+    document = _document(html)
+    if document is None:
+        return
+    for episode in LISTING_EPISODES(document):
+        link = _first(POST_TITLE_LINK, episode)
+        date = _first(BYLINE_TIME, episode)
+        notes = _first(CONTENT, episode)
+        if link is None or date is None or notes is None:
+            raise AttributeError("listing episode is missing its title, date or notes")
+        yield _text(link), _text(date).strip(), link.get('href'), _text(notes, "\n")
+
+
+def episode_links(html):
+    """(title, date text, url) for each episode link on a TMA listing page."""
+    if lxml is None:
+        yield from _soup_episode_links(html)
+        return
+    document = _document(html)
+    if document is None:
+        return
+    for episode in EPISODE_LINKS(document):
+        title = _first(LINK_TITLE, episode)
+        date = _first(LINK_TIME, episode)
+        if title is not None and date is not None:
+            yield _text(title).strip(), _text(date).strip(), episode.get('href')
+
+
+def page_show_notes(html):
+    """Show notes text of an episode page, or None when it has none."""
+    if lxml is None:
+        return _soup_page_show_notes(html)
+    document = _document(html)
+    notes = _first(PAGE_CONTENT, document) if document is not None else None
+    return _text(notes, "\n") if notes is not None else None
+
+
+# BeautifulSoup fallbacks, the selectors the scrapers originally used
+
+def _soup_listing_episodes(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for episode in soup.find_all('div', class_='col-10 px-3 align-self-center'):
+        link = episode.select_one('.post-title a')
+        yield (
+            link.text,
+            episode.select_one('.byline time').text.strip(),
+            link['href'],
+            episode.select_one('.the_content').get_text(separator="\n"),
+        )
+
+
+def _soup_episode_links(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for episode in soup.find_all('a', class_='episode-link'):
+        title = episode.find('h6', class_='post-title')
+        date = episode.find('time')
+        if title and date:
+            yield title.text.strip(), date.text.strip(), episode['href']
+
+
+def _soup_page_show_notes(html):
+    notes = BeautifulSoup(html, 'html.parser').find('div', class_='the_content')
+    return notes.get_text(separator="\n") if notes else None
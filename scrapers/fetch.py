@@ -0,0 +1,157 @@
+"""
+Concurrent Page Fetcher for the TMASearcher scrapers
+One pooled requests session shared by a thread pool. Each host gets a
+concurrency limit and a token bucket, so pages download in parallel while
+the site still sees a polite request rate.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 4  # requests in flight per host
+RATE_PER_SECOND = 2.0  # sustained requests per second per host
+BURST = 4
+TIMEOUT = 30  # seconds
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, up to `burst` at once."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """Thread-pool HTTP fetcher with per-host limits; use as a context manager.
+
+    get() fetches on the calling thread, submit() returns a Future, and map()
+    yields (url, response) pairs in input order while later URLs download.
+    Failed requests yield the exception in place of the response.
+
+    With an HTTPCache (scrapers/cache.py), conditional=True on submit() and
+    map() sends the saved validators and gives None instead of the response
+    when the page has not changed since the cache was last saved.
+    """
+
+    def __init__(self, headers=None, max_workers=MAX_WORKERS, per_host=PER_HOST_LIMIT,
+                 rate=RATE_PER_SECOND, burst=BURST, timeout=TIMEOUT, cache=None):
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+        self._hosts = {}  # host -> (Semaphore, TokenBucket)
+        self._hosts_lock = threading.Lock()
+
+    def _host_limits(self, url):
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = (threading.Semaphore(self.per_host), TokenBucket(self.rate, self.burst))
+            return self._hosts[host]
+
+    def get(self, url, **kwargs):
+        """Fetch url, waiting for its host's concurrency slot and rate token."""
+        semaphore, bucket = self._host_limits(url)
+        with semaphore:
+            bucket.acquire()
+            kwargs.setdefault('timeout', self.timeout)
+            return self.session.get(url, **kwargs)
+
+    def get_if_changed(self, url, headers=None, **kwargs):
+        """get() with the cache's validators; None when the page is unchanged.
+
+        Changed pages are staged in the cache. Without a cache this is get().
+        With stream=True only the validators are used, so the body is left
+        unread for the caller.
+        """
+        if self.cache is None:
+            return self.get(url, headers=headers, **kwargs)
+        hash_body = not kwargs.get('stream', False)
+        headers = {**(headers or {}), **self.cache.conditional_headers(url)}
+        response = self.get(url, headers=headers, **kwargs)
+        if self.cache.unchanged(url, response, hash_body=hash_body):
+            logging.info(f"Unchanged since the last run: {url}")
+            response.close()
+            return None
+        if response.status_code == 200:
+            self.cache.stage(url, response, hash_body=hash_body)
+        return response
+
+    def submit(self, url, conditional=False, **kwargs):
+        """Start fetching url in the background; returns a Future for the response."""
+        return self._executor.submit(self.get_if_changed if conditional else self.get, url, **kwargs)
+
+    def map(self, urls, window=None, **kwargs):
+        """Fetch urls concurrently, yielding (url, response or exception) in order.
+
+        window caps how many URLs are in progress at once, counting the one
+        being yielded; by default every URL starts straight away. Callers that
+        may stop early use a small window so unread pages are never fetched.
+        """
+        urls = list(urls)
+        window = window or len(urls)
+        futures = deque()
+        position = 0
+        try:
+            while futures or position < len(urls):
+                while position < len(urls) and len(futures) < window:
+                    futures.append((urls[position], self.submit(urls[position], **kwargs)))
+                    position += 1
+                url, future = futures.popleft()
+                try:
+                    yield url, future.result()
+                except requests.RequestException as e:
+                    logging.error(f"Request failed for {url}: {e}")
+                    yield url, e
+        finally:
+            # A caller that stops early does not wait for pages it will never read
+            for _, future in futures:
+                future.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,207 @@
+"""
+Scraper Parsers for TMASearcher
+Each parser takes a source config (see scrapers/sources.py), a shared
+Fetcher and the set of URLs already stored, and returns the source's
+episodes as dicts keyed by column name, ready for
+scrapers.store.write_episodes(). PARSERS maps the names used in the configs
+to the functions.
+
+Unless backfill is set, HTML parsers run incrementally: episode pages of
+known URLs are not fetched, and paging stops after a run of known episodes
+or at a listing page that has not changed since the last run. Backfills
+still skip parsing episode pages whose content has not changed.
+"""
+import logging
+import re
+from datetime import datetime
+
+from scrapers.extract import episode_links, listing_episodes, page_show_notes
+from scrapers.spotify import get_client
+
+# Consecutive already-stored episodes after which an incremental run stops
+# paging (per source: 'stop_after_known')
+STOP_AFTER_KNOWN = 10
+
+# Ad footer appended to show notes by the podcast hosts
+AD_CHOICES_PATTERN = re.compile(
+    r'Learn more about your ad choices\.?\s*Visit\s*(?:podcastchoices\.com|megaphone\.fm)/adchoices\.?',
+    re.IGNORECASE
+)
+
+
+def convert_date_format(date_str):
+    """Convert "MONTH DAY, YEAR" to "YYYY-MM-DD"."""
+    date_obj = datetime.strptime(date_str, '%B %d, %Y')
+    return date_obj.strftime('%Y-%m-%d')
+
+
+def clean_show_notes(notes):
+    """Show notes text without the ad-choices footer."""
+    return AD_CHOICES_PATTERN.sub('', notes.strip()).strip()
+
+
+class PartialScrape(Exception):
+    """Raised by a parser that missed some of the episodes it should have read.
+
+    Carries the episodes it did read, which are still stored; the run just
+    does not count as complete, so its pages are read again next time.
+    """
+
+    def __init__(self, episodes, errors):
+        super().__init__(f"{len(errors)} failed: {'; '.join(errors)}")
+        self.episodes = episodes
+        self.errors = errors
+
+
+def listing_pages(source, fetcher, backfill=True, errors=None):
+    """HTML of the listing pages of a source, in order.
+
+    Pages download concurrently; iteration stops at the first page that
+    fails, since later pages would not exist either. Incremental runs only
+    fetch one page ahead, since they usually stop after the first page, and
+    stop at a page that is unchanged since the last run: everything on it
+    and after it has already been stored. A page that fails to download is
+    recorded in errors.
+    """
+    urls = [f"{source['url']}?episode_page={page_num}" for page_num in range(1, source['pages'] + 1)]
+    window = None if backfill else 2
+    pages = fetcher.map(urls, window=window, conditional=not backfill, headers=source.get('headers'))
+    for page_num, (url, response) in enumerate(pages, start=1):
+        if response is None:
+            logging.info(f"Page {page_num} unchanged since the last run, stopping")
+            return
+        if isinstance(response, Exception):
+            logging.error(f"An error occurred on page {page_num}: {response}")
+            if errors is not None:
+                errors.append(f"page {page_num}: {response}")
+            return
+        if response.status_code != 200:
+            logging.error(f"Failed to retrieve web page, status code: {response.status_code}")
+            return
+        yield page_num, response.text
+
+
+class KnownRun:
+    """Counts consecutive already-stored episodes in listing order."""
+
+    def __init__(self, source, known_urls, backfill):
+        self.known_urls = known_urls
+        self.limit = None if backfill else source.get('stop_after_known', STOP_AFTER_KNOWN)
+        self.run = 0
+
+    def seen(self, url):
+        """Record url; returns True once the run of known episodes is long enough to stop."""
+        self.run = self.run + 1 if url in self.known_urls else 0
+        return self.limit is not None and self.run >= self.limit
+
+
+def html_listing(source, fetcher, known_urls=frozenset(), backfill=False):
+    """Episodes whose full show notes are on the listing page (TMShow, Balloon).
+
+    Known episodes on the pages that are read are still returned, since
+    they cost nothing extra and pick up edits to their notes.
+    """
+    episodes, errors = [], []
+    known_run = KnownRun(source, known_urls, backfill)
+    for page_num, html in listing_pages(source, fetcher, backfill, errors):
+        try:
+            for title, date, url, notes in listing_episodes(html):
+                episodes.append({
+                    'TITLE': title,
+                    'DATE': convert_date_format(date),
+                    'URL': url,
+                    'SHOW_NOTES': clean_show_notes(notes),
+                })
+                logging.info(f"Scraped: {title}")
+                if known_run.seen(url):
+                    logging.info(f"Stopping after {known_run.run} known episodes on page {page_num}")
+                    return episodes
+        except Exception as e:
+            logging.error(f"An error occurred on page {page_num}: {e}")
+            errors.append(f"page {page_num}: {e}")
+            break
+    if errors:
+        raise PartialScrape(episodes, errors)
+    return episodes
+
+
+def html_detail(source, fetcher, known_urls=frozenset(), backfill=False):
+    """Episodes whose show notes are only on each episode's own page (TMA).
+
+    Episode pages are queued as soon as their listing page is parsed, so
+    they download while the remaining listing pages are still coming in.
+    Incremental runs skip the episode pages of known URLs. Episode pages
+    that fail are reported with PartialScrape once the rest are read.
+    """
+    pending, errors = [], []
+    known_run = KnownRun(source, known_urls, backfill)
+    for page_num, html in listing_pages(source, fetcher, backfill, errors):
+        try:
+            for title, date, url in episode_links(html):
+                if known_run.seen(url):
+                    logging.info(f"Stopping after {known_run.run} known episodes on page {page_num}")
+                    break
+                if not backfill and url in known_urls:
+                    continue
+                pending.append((
+                    title,
+                    convert_date_format(date),
+                    url,
+                    # A known episode's page is skipped when its content is unchanged
+                    fetcher.submit(url, conditional=url in known_urls, headers=source.get('headers'))
+                ))
+            else:
+                continue
+            break  # Stopped on known episodes
+        except Exception as e:
+            logging.error(f"An error occurred on page {page_num}: {e}")
+            errors.append(f"page {page_num}: {e}")
+            break
+
+    episodes = []
+    for title, date, url, future in pending:
+        try:
+            response = future.result()
+            if response is None:
+                continue  # Known episode, page unchanged
+            if response.status_code != 200:
+                raise ValueError(f"status code {response.status_code}")
+            notes = page_show_notes(response.text)
+            if notes is None:
+                raise ValueError("no show notes on the page")
+            episodes.append({'TITLE': title, 'DATE': date, 'URL': url, 'SHOW_NOTES': clean_show_notes(notes)})
+            logging.info(f"Scraped: {title}")
+        except Exception as e:
+            logging.error(f"An error occurred fetching {url}: {e}")
+            errors.append(f"{url}: {e}")
+    if errors:
+        raise PartialScrape(episodes, errors)
+    return episodes
+
+
+def spotify(source, fetcher, known_urls=frozenset(), backfill=False):
+    """Episodes of a Spotify show, for the <podcast>Spot tables.
+
+    Incremental runs read down to the first stored episode past the newest
+    'recent_episodes', which are refetched so late tmastl.com posts still
+    get linked. Backfills read the whole catalog.
+    """
+    # Stored URLs are open.spotify.com/episode/<id>
+    known_ids = None if backfill else {url.rsplit('/', 1)[-1] for url in known_urls}
+    # A missing token or failed page raises, so the run does not count as complete
+    episodes = get_client().show_episodes(fetcher, source['show_id'], known_ids=known_ids,
+                                          recent=source.get('recent_episodes', 0))
+    return [{
+        'ID': episode.get('id'),
+        'Title': episode.get('name'),
+        'Date': episode.get('release_date'),
+        'URL': episode.get('external_urls', {}).get('spotify'),
+        'Description': episode.get('description'),
+    } for episode in episodes]
+
+
+PARSERS = {
+    'html_listing': html_listing,
+    'html_detail': html_detail,
+    'spotify': spotify,
+}
@@ -0,0 +1,72 @@
+"""
+Streaming RSS Reader for TMASearcher
+Reads the megaphone feed item by item with iterparse straight off the HTTP
+response, keeping only the fields the RSS scripts use. A daily run stops
+reading (and downloading) at the first item older than its cutoff; a full
+read of the feed's history holds one item in memory at a time.
+"""
+import html
+import logging
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+
+FEED_URL = "https://feeds.megaphone.fm/tmastl"
+
+ITUNES_DURATION = '{http://www.itunes.com/dtds/podcast-1.0.dtd}duration'
+
+
+def parse_pub_date(rss_date):
+    """Convert an RSS pubDate ("Mon, 02 Apr 2018 12:07:52 -0000") to "YYYY-MM-DD"."""
+    return parsedate_to_datetime(rss_date).strftime("%Y-%m-%d")
+
+
+def open_feed(fetcher, url=FEED_URL):
+    """Streamed feed response, or None when it is unchanged since the cache was last saved.
+
+    Use the response as a context manager, so a reader that stops early
+    closes the connection instead of downloading the rest.
+    """
+    response = fetcher.get_if_changed(url, stream=True)
+    if response is None:
+        return None
+    response.raise_for_status()
+    response.raw.decode_content = True  # Let iterparse read through gzip
+    return response
+
+
+def iter_items(stream, cutoff=None):
+    """Yield the feed's items in feed order as dicts.
+
+    Each has title, date ("YYYY-MM-DD"), mp3_url, guid and duration. The feed
+    lists newest first, so reading stops at the first item dated before
+    cutoff. Items without a pubDate are skipped.
+    """
+    channel = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'channel':
+                channel = element
+            continue
+        if element.tag != 'item':
+            continue
+
+        pub_date = element.findtext('pubDate')
+        enclosure = element.find('enclosure')
+        item = {
+            # Titles in CDATA can still carry entities, which feedparser used to decode
+            'title': html.unescape(element.findtext('title') or '').strip(),
+            'date': parse_pub_date(pub_date) if pub_date else None,
+            'mp3_url': enclosure.get('url') if enclosure is not None else None,
+            'guid': element.findtext('guid'),
+            'duration': element.findtext(ITUNES_DURATION),
+        }
+        # Drop the parsed item so memory stays flat over the whole feed
+        if channel is not None:
+            channel.remove(element)
+
+        if item['date'] is None:
+            logging.warning(f"Skipping feed item without a pubDate: {item['title']}")
+            continue
+        if cutoff and item['date'] < cutoff:
+            return
+        yield item
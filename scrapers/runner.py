@@ -0,0 +1,140 @@
+"""
+Scraper Runner for TMASearcher
+Runs any set of sources from scrapers/sources.py in one process: one pooled
+Fetcher, one database connection, sources fetched side by side and written
+one transaction at a time.
+
+Usage:
+    python -m scrapers [--backfill] [source ...]
+
+With no sources given, every source runs. Runs are incremental: episodes
+already in the database are not fetched again, and paging stops once a run
+of them is reached. --backfill walks every listing page instead. A run that
+finds another scrape (or the scheduler) in progress exits without doing
+anything.
+"""
+import argparse
+import fcntl
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+import db
+from scrapers.cache import HTTPCache
+from scrapers.fetch import Fetcher
+from scrapers.parsers import PARSERS, PartialScrape
+from scrapers.sources import SOURCES
+from scrapers.store import known_urls, write_episodes
+
+# The scrapers have always kept their database and logs next to the scripts
+BASE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_PATH = os.environ.get('DATABASE_URL', os.path.join(BASE_DIRECTORY, 'TMASTL.db'))
+LOG_FILE = 'scraping.log'
+RUN_LOCK = os.path.join(BASE_DIRECTORY, 'scrape.lock')
+
+
+def run_sources(names, db_path=None, backfill=False, conn=None, fetcher=None):
+    """Scrape and store the named sources; returns {name: write_episodes() counts}.
+
+    Each source's counts carry 'complete', which is False when the parser
+    only read some of its episodes (PartialScrape); sources that failed
+    outright are left out.
+
+    A long-running caller (the scheduler) passes its own connection and
+    Fetcher to share them across runs; otherwise both are made for this run.
+    """
+    load_dotenv(os.path.join(BASE_DIRECTORY, 'spot.env'))  # Spotify credentials
+    own_conn, own_fetcher = conn is None, fetcher is None
+    if own_conn:
+        conn = db.connect(db_path or DATABASE_PATH)
+    if own_fetcher:
+        fetcher = Fetcher(cache=HTTPCache())
+    results = {}
+    try:
+        cursor = conn.cursor()
+        known = {name: known_urls(cursor, SOURCES[name]['table']) for name in names}
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            futures = {
+                pool.submit(PARSERS[SOURCES[name]['parser']], SOURCES[name], fetcher,
+                            known_urls=known[name], backfill=backfill): name
+                for name in names
+            }
+            # Network work overlaps across sources; writes stay on this thread's connection
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    complete = True
+                    try:
+                        episodes = future.result()
+                    except PartialScrape as e:
+                        # Store what was read, but the source did not complete
+                        logging.error(f"{name}: scrape incomplete: {e}")
+                        episodes, complete = e.episodes, False
+                    results[name] = {**write_episodes(conn, SOURCES[name], episodes), 'complete': complete}
+                    logging.info(f"{name}: {len(episodes)} scraped")
+                except Exception as e:
+                    logging.error(f"{name}: scrape failed: {e}")
+        # Pages count as seen only once everything parsed from them is stored
+        if fetcher.cache is not None:
+            if all(results.get(name, {}).get('complete') for name in names):
+                fetcher.cache.save()
+            else:
+                fetcher.cache.discard()
+    finally:
+        if own_fetcher:
+            fetcher.close()
+        if own_conn:
+            conn.close()
+    return results
+
+
+@contextmanager
+def run_lock(blocking=False):
+    """Hold the file lock that keeps scrapes from overlapping; yields False if it is taken.
+
+    The scheduler and the command-line runs share it, so a cron job or a
+    manual backfill never writes alongside a scheduled run.
+    """
+    with open(RUN_LOCK, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scrapers', description='Scrape podcast episodes into the database.')
+    parser.add_argument('sources', nargs='*', metavar='source',
+                        help=f"sources to run (default: all of {', '.join(SOURCES)})")
+    parser.add_argument('--backfill', action='store_true',
+                        help='walk every listing page and refetch known episodes')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.sources if name not in SOURCES]
+    if unknown:
+        parser.error(f"unknown source: {', '.join(unknown)}")
+    names = args.sources or list(SOURCES)
+
+    # A single source keeps the log file its old standalone script used
+    log_file = SOURCES[names[0]]['log'] if len(names) == 1 else LOG_FILE
+    logging.basicConfig(
+        filename=os.path.join(BASE_DIRECTORY, log_file),
+        level=logging.INFO,
+        format='%(asctime)s:%(levelname)s:%(message)s',
+        force=True
+    )
+
+    logging.info("Script started")
+    with run_lock() as acquired:
+        if not acquired:
+            logging.info("Another scrape is running, skipping this one.")
+            return
+        run_sources(names, backfill=args.backfill)
+    logging.info("Finished scraping the requested sources.")
@@ -0,0 +1,201 @@
+"""
+Scrape Scheduler for TMASearcher
+One long-running process in place of a cron entry per scraper. Every source
+in scrapers/sources.py runs on its own interval plus some jitter, and the
+megaphone mp3 reconcile (mp3daily.py) runs after the TMA scrape it depends
+on. All jobs share one Fetcher and one database connection, and when each
+job last ran is kept in a JSON file, so a restart picks up the schedule
+where it left off.
+
+Usage:
+    python -m scrapers.scheduler [--once] [job ...]
+
+With no jobs given, every source and task is scheduled. --once runs the
+jobs that are due and exits. Only one scheduler runs at a time, and rounds
+take the same lock as `python -m scrapers`, so they never overlap with a
+cron or manual run.
+"""
+import argparse
+import fcntl
+import json
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from graphlib import TopologicalSorter
+
+import db
+from rss_reconcile import reconcile_feed
+from scrapers.cache import HTTPCache
+from scrapers.fetch import Fetcher
+from scrapers.runner import BASE_DIRECTORY, DATABASE_PATH, run_lock, run_sources
+from scrapers.sources import SOURCES
+
+STATE_PATH = os.environ.get('SCHEDULER_STATE', os.path.join(BASE_DIRECTORY, 'scheduler_state.json'))
+SCHEDULER_LOCK = os.path.join(BASE_DIRECTORY, 'scheduler.lock')
+LOG_FILE = 'scheduler.log'
+
+DEFAULT_INTERVAL = 60 * 60  # seconds, for jobs without an 'interval'
+JITTER = 0.1  # each run is pushed back by up to this fraction of its interval
+MAX_SLEEP = 60  # seconds between checks for due jobs
+MP3_LOOKBACK_DAYS = 5
+
+
+def sync_mp3_urls(conn, fetcher):
+    """Fill in mp3 URLs from the last MP3_LOOKBACK_DAYS of the megaphone feed."""
+    cutoff = (datetime.now() - timedelta(days=MP3_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    result = reconcile_feed(conn, fetcher, cutoff=cutoff)
+    if result is None:
+        logging.info("mp3: feed unchanged since the last run")
+        return
+    logging.info(f"mp3: {result['matched']} matched, {result['updated']} updated, {result['unmatched']} unmatched")
+    # As in mp3daily.py, keep the feed's validators only once every entry matched
+    if result['unmatched']:
+        fetcher.cache.discard()
+    else:
+        fetcher.cache.save()
+
+
+# Jobs besides the sources. 'after' names jobs that run first when both are
+# due in the same round.
+TASKS = {
+    'mp3': {'run': sync_mp3_urls, 'interval': 60 * 60, 'after': ['tma']},
+}
+
+
+def job_config(name):
+    return SOURCES[name] if name in SOURCES else TASKS[name]
+
+
+class Scheduler:
+    """Runs due jobs in dependency order and remembers when each one ran."""
+
+    def __init__(self, names=None, state_path=None, db_path=None):
+        self.names = list(names or [*SOURCES, *TASKS])
+        self.state_path = state_path or STATE_PATH
+        self.state = self._load_state()
+        self.conn = db.connect(db_path or DATABASE_PATH)
+        self.fetcher = Fetcher(cache=HTTPCache())
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable scheduler state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def due(self, now=None):
+        """Names of the jobs whose next run time has passed."""
+        now = now or time.time()
+        return [name for name in self.names if self.state.get(name, {}).get('next_run', 0) <= now]
+
+    def seconds_until_due(self, now=None):
+        now = now or time.time()
+        next_runs = [self.state.get(name, {}).get('next_run', 0) for name in self.names]
+        return max(0, min(next_runs) - now)
+
+    def _finish(self, name, succeeded):
+        now = time.time()
+        interval = job_config(name).get('interval', DEFAULT_INTERVAL)
+        self.state[name] = {
+            'last_run': now,
+            'last_run_at': datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+            'status': 'ok' if succeeded else 'failed',
+            'next_run': now + interval + random.uniform(0, interval * JITTER),
+        }
+
+    def _run_task(self, name):
+        try:
+            TASKS[name]['run'](self.conn, self.fetcher)
+            return True
+        except Exception as e:
+            logging.error(f"{name}: task failed: {e}")
+            return False
+
+    def run_due(self):
+        """Run every due job, sources that are ready together, then save the state."""
+        due = self.due()
+        if not due:
+            return []
+        graph = {name: [dep for dep in job_config(name).get('after', []) if dep in due] for name in due}
+        sorter = TopologicalSorter(graph)
+        sorter.prepare()
+        logging.info(f"Running: {', '.join(due)}")
+        with run_lock(blocking=True):
+            while sorter.is_active():
+                ready = sorter.get_ready()
+                sources = [name for name in ready if name in SOURCES]
+                if sources:
+                    results = run_sources(sources, conn=self.conn, fetcher=self.fetcher)
+                    for name in sources:
+                        self._finish(name, results.get(name, {}).get('complete', False))
+                for name in ready:
+                    if name not in SOURCES:
+                        self._finish(name, self._run_task(name))
+                sorter.done(*ready)
+        self._save_state()
+        return due
+
+    def run_forever(self, stop):
+        """Run due jobs until the stop Event is set."""
+        while not stop.is_set():
+            self.run_due()
+            stop.wait(min(MAX_SLEEP, self.seconds_until_due()))
+
+    def close(self):
+        self.fetcher.close()
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scrapers.scheduler', description='Run the scrapers on a schedule.')
+    parser.add_argument('jobs', nargs='*', metavar='job',
+                        help=f"jobs to schedule (default: all of {', '.join([*SOURCES, *TASKS])})")
+    parser.add_argument('--once', action='store_true', help='run the jobs that are due, then exit')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.jobs if name not in SOURCES and name not in TASKS]
+    if unknown:
+        parser.error(f"unknown job: {', '.join(unknown)}")
+
+    logging.basicConfig(
+        filename=os.path.join(BASE_DIRECTORY, LOG_FILE),
+        level=logging.INFO,
+        format='%(asctime)s:%(levelname)s:%(message)s',
+        force=True
+    )
+
+    with open(SCHEDULER_LOCK, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            parser.exit(1, "Another scheduler is already running.\n")
+
+        scheduler = Scheduler(args.jobs)
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        logging.info("Scheduler started")
+        try:
+            if args.once:
+                scheduler.run_due()
+            else:
+                scheduler.run_forever(stop)
+        finally:
+            scheduler.close()
+            logging.info("Scheduler stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Scraper Sources for TMASearcher
+Everything that differs between podcasts lives here. Adding a podcast (or a
+new place to pull one from) is a new entry, not a new script.
+
+Keys:
+    table            table the episodes are written to
+    parser           name of the function in scrapers.parsers.PARSERS
+    log              log file used when the source is run on its own
+    interval         seconds between runs under the scheduler (scrapers/scheduler.py)
+    url, pages       (HTML parsers) listing URL and number of listing pages
+    headers          (HTML parsers) extra request headers
+    stop_after_known (HTML parsers) known episodes in a row that end an
+                     incremental run (default parsers.STOP_AFTER_KNOWN)
+    show_id          (spotify) Spotify show ID
+    recent_episodes  (spotify) newest episodes refetched on every incremental run
+    link_table       (spotify) podcast table whose rows get the Spotify URLs
+"""
+
+SOURCES = {
+    'tma': {
+        'table': 'TMA',
+        'parser': 'html_detail',
+        'url': 'https://www.tmastl.com/podcasts/the-morning-after/',
+        'pages': 15,
+        'headers': {'Referer': 'https://www.tmastl.com/', 'Upgrade-Insecure-Requests': '1'},
+        'log': 'tma_scraping.log',
+        'interval': 60 * 60,
+    },
+    'tmshow': {
+        'table': 'TMShow',
+        'parser': 'html_listing',
+        'url': 'https://www.tmastl.com/podcasts/the-tim-mckernan-show/',
+        'pages': 1,
+        'log': 'tmshow_podcast_scraping.log',
+        'interval': 60 * 60,
+    },
+    'balloon': {
+        'table': 'Balloon',
+        'parser': 'html_listing',
+        'url': 'https://www.tmastl.com/podcasts/balloon-party-with-tim-mckernan/',
+        'pages': 1,
+        'log': 'balloon_podcast_scraping.log',
+        'interval': 6 * 60 * 60,
+    },
+    'tma_spotify': {
+        'table': 'TMASpot',
+        'parser': 'spotify',
+        'show_id': '5J1llB45yFxThCOZhhY6R9',
+        'recent_episodes': 10,
+        'link_table': 'TMA',
+        'log': 'TMAspotify_scraping.log',
+        'interval': 3 * 60 * 60,
+    },
+    'tmshow_spotify': {
+        'table': 'TMShowSpot',
+        'parser': 'spotify',
+        'show_id': '4cy7U6F2fIlh18fwlMAczC',
+        'recent_episodes': 3,
+        'link_table': 'TMShow',
+        'log': 'TMShow_spotify_scraping.log',
+        'interval': 3 * 60 * 60,
+    },
+    'balloon_spotify': {
+        'table': 'BalloonSpot',
+        'parser': 'spotify',
+        'show_id': '1ksryirpx66HWJnZFtMEo0',
+        'recent_episodes': 8,
+        'link_table': 'Balloon',
+        'log': 'Balloon_spotify_scraping.log',
+        'interval': 6 * 60 * 60,
+    },
+}
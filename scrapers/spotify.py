@@ -0,0 +1,139 @@
+"""
+Spotify API access for TMASearcher
+One client-credentials client per process, shared by the scrapers and the
+web app. The access token is reused until shortly before it expires, rate
+limited requests wait out Retry-After, and a show's catalog is read by
+fetching its first page for the total and the remaining pages concurrently.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+TOKEN_URL = 'https://accounts.spotify.com/api/token'
+API_URL = 'https://api.spotify.com/v1'
+
+TOKEN_MARGIN = 60  # seconds before expiry that a cached token is replaced
+MAX_RETRIES = 3  # per request, for 429s and one expired token
+PAGE_SIZE = 50  # Spotify's maximum for show episodes
+PAGE_WORKERS = 4
+TOKEN_TIMEOUT = 10  # seconds; the token request holds the client's lock
+
+
+class SpotifyClient:
+    """Client-credentials Spotify Web API client with a cached token."""
+
+    def __init__(self, client_id=None, client_secret=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def access_token(self, session=None):
+        """Cached access token, requesting a new one when it is about to expire.
+
+        None if Spotify refuses or does not answer within TOKEN_TIMEOUT.
+        """
+        with self._lock:
+            if self._token and time.time() < self._expires_at - TOKEN_MARGIN:
+                return self._token
+
+            try:
+                response = (session or requests).post(
+                    TOKEN_URL,
+                    data={'grant_type': 'client_credentials'},
+                    auth=(self.client_id or os.environ.get('SPOTIFY_CLIENT_ID'),
+                          self.client_secret or os.environ.get('SPOTIFY_CLIENT_SECRET')),
+                    timeout=TOKEN_TIMEOUT
+                )
+            except requests.RequestException as e:
+                logging.error(f"Failed to obtain access token: {e}")
+                return None
+            if response.status_code != 200:
+                logging.error(f"Failed to obtain access token: Status code {response.status_code}")
+                return None
+            data = response.json()
+            self._token = data['access_token']
+            self._expires_at = time.time() + data.get('expires_in', 3600)
+            logging.info("Successfully obtained access token.")
+            return self._token
+
+    def _invalidate(self, token):
+        with self._lock:
+            if self._token == token:
+                self._token = None
+
+    def get(self, fetcher, path, params=None):
+        """GET an API path through the fetcher; returns the response.
+
+        429s are retried after their Retry-After, and a 401 gets one retry
+        with a fresh token.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            token = self.access_token(fetcher.session)
+            if token is None:
+                raise RuntimeError("No Spotify access token. Check your Spotify credentials.")
+            response = fetcher.get(f"{API_URL}{path}", headers={"Authorization": f"Bearer {token}"}, params=params)
+            if attempt == MAX_RETRIES:
+                break
+            if response.status_code == 429:
+                wait = int(response.headers.get('Retry-After', 1))
+                logging.warning(f"Spotify rate limit hit, retrying in {wait}s")
+                time.sleep(wait)
+            elif response.status_code == 401 and attempt == 0:
+                self._invalidate(token)
+            else:
+                break
+        return response
+
+    def _episode_page(self, fetcher, show_id, offset, market):
+        response = self.get(fetcher, f"/shows/{show_id}/episodes",
+                            params={"market": market, "limit": PAGE_SIZE, "offset": offset})
+        if response.status_code != 200:
+            raise RuntimeError(f"Error fetching episodes at offset {offset}: Status code {response.status_code}")
+        return response.json()
+
+    def show_episodes(self, fetcher, show_id, known_ids=None, recent=0, market='US'):
+        """Episodes of a show, newest first, as returned by the Spotify API.
+
+        With known_ids, reading stops at the first known episode after the
+        newest `recent` ones, which are always returned; pages are then read
+        one at a time. Otherwise the whole catalog is read: the first page
+        gives the total and the rest are fetched concurrently.
+        """
+        first = self._episode_page(fetcher, show_id, 0, market)
+        total = first.get('total', 0)
+
+        if known_ids:
+            episodes, offset, page = [], 0, first
+            while True:
+                for episode in filter(None, page.get('items', [])):  # Unavailable episodes are null
+                    if episode.get('id') in known_ids and len(episodes) >= recent:
+                        return episodes
+                    episodes.append(episode)
+                offset += PAGE_SIZE
+                if offset >= total or not page.get('next'):
+                    return episodes
+                page = self._episode_page(fetcher, show_id, offset, market)
+
+        offsets = range(PAGE_SIZE, total, PAGE_SIZE)
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as pool:
+            pages = list(pool.map(lambda offset: self._episode_page(fetcher, show_id, offset, market), offsets))
+        return [episode for page in [first, *pages] for episode in page.get('items', []) if episode]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide Spotify client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SpotifyClient()
+        return _client
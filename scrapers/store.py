@@ -0,0 +1,158 @@
+"""
+Scraper Storage for TMASearcher
+Writes parsed episodes through one shared connection as one batched upsert
+per source, and links them to Spotify.
+"""
+import logging
+import sqlite3
+
+from spotify_links import SPOTIFY_TABLES, link_new_episode, link_spotify_episode
+from titles import normalize_title, title_key_index_sql
+
+EPISODE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        TITLE TEXT NOT NULL,
+        DATE TEXT NOT NULL,
+        URL TEXT NOT NULL UNIQUE,
+        SHOW_NOTES TEXT NOT NULL,
+        title_key TEXT,
+        spotify_url TEXT
+    );
+'''
+
+SPOTIFY_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        ID TEXT PRIMARY KEY,
+        Title TEXT NOT NULL,
+        Date TEXT NOT NULL,
+        URL TEXT NOT NULL UNIQUE,
+        Description TEXT NOT NULL,
+        title_key TEXT
+    );
+'''
+
+
+def title_columns(source):
+    """(title, date) columns of a source's table, which follow from its parser."""
+    return ('Title', 'Date') if source['parser'] == 'spotify' else ('TITLE', 'DATE')
+
+
+def setup_table(cursor, source):
+    """Create the source's table and its title_key index if this is its first run."""
+    sql = SPOTIFY_TABLE_SQL if source['parser'] == 'spotify' else EPISODE_TABLE_SQL
+    cursor.execute(sql.format(table=source['table']))
+    cursor.execute(title_key_index_sql(source['table'], title_columns(source)[1]))
+
+
+# URLs per SELECT ... IN (...) lookup, well under SQLite's variable limit
+LOOKUP_CHUNK = 500
+
+
+def existing_rows(cursor, table_name, columns, urls):
+    """Stored values of columns for each of urls that is already in the table."""
+    found = {}
+    for i in range(0, len(urls), LOOKUP_CHUNK):
+        chunk = urls[i:i + LOOKUP_CHUNK]
+        placeholders = ', '.join('?' for _ in chunk)
+        cursor.execute(f"SELECT URL, {', '.join(columns)} FROM {table_name} WHERE URL IN ({placeholders})", chunk)
+        for row in cursor.fetchall():
+            found[row[0]] = tuple(row[1:])
+    return found
+
+
+def known_urls(cursor, table_name):
+    """Every URL already stored for a source, loaded once per run."""
+    try:
+        cursor.execute(f"SELECT URL FROM {table_name}")
+    except sqlite3.OperationalError:
+        return set()  # First run: the table does not exist yet
+    return {row[0] for row in cursor.fetchall()}
+
+
+def write_episodes(conn, source, episodes):
+    """Upsert a batch of episodes keyed on URL and link new ones to Spotify.
+
+    The whole batch is one executemany INSERT ... ON CONFLICT(URL) DO UPDATE
+    in a single transaction. Rows whose stored values already match are left
+    alone, so they do not fire update triggers. Returns counts of inserted,
+    updated, unchanged and skipped (missing a required value) episodes.
+    """
+    table_name = source['table']
+    title_column, _ = title_columns(source)
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+
+    # Later duplicates of a URL win, as they would with row-by-row upserts
+    batch = {}
+    for episode in episodes:
+        if any(value is None for value in episode.values()):
+            logging.error(f"Skipping episode with missing values: {episode.get('URL')}")
+            counts['skipped'] += 1
+            continue
+        batch[episode['URL']] = {**episode, 'title_key': normalize_title(episode[title_column])}
+    if not batch:
+        return counts
+
+    columns = list(next(iter(batch.values())))
+    # The Spotify tables' ID is the Spotify episode ID and never changes
+    update_columns = [c for c in columns if c not in ('URL', 'ID')]
+    cursor = conn.cursor()
+    with conn:
+        setup_table(cursor, source)
+        stored = existing_rows(cursor, table_name, update_columns, list(batch))
+        for url, episode in batch.items():
+            if url not in stored:
+                counts['inserted'] += 1
+            elif stored[url] == tuple(episode[c] for c in update_columns):
+                counts['unchanged'] += 1
+            else:
+                counts['updated'] += 1
+
+        assignments = ', '.join(f"{c} = excluded.{c}" for c in update_columns)
+        changed = ' OR '.join(f"{c} IS NOT excluded.{c}" for c in update_columns)
+        cursor.executemany(f'''
+            INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})
+            ON CONFLICT(URL) DO UPDATE SET {assignments} WHERE {changed}
+        ''', [[episode[c] for c in columns] for episode in batch.values()])
+
+        new_urls = [url for url in batch if url not in stored]
+        if new_urls and table_name in SPOTIFY_TABLES:
+            ids = existing_rows(cursor, table_name, ['ID'], new_urls)
+            link_new_episodes(cursor, table_name, [
+                (ids[url][0], batch[url]['TITLE'], batch[url]['DATE']) for url in new_urls if url in ids
+            ])
+
+        if source.get('link_table'):
+            # Link every fetched episode, not only new ones, so episodes scraped
+            # from tmastl.com after their Spotify release still get picked up
+            link_spotify_episodes(cursor, source['link_table'], batch.values())
+
+    logging.info(
+        f"{table_name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged, {counts['skipped']} skipped"
+    )
+    return counts
+
+
+def link_new_episodes(cursor, table_name, rows):
+    """Pick up Spotify releases scraped before these (id, title, date) episodes."""
+    for episode_id, title, date in rows:
+        try:
+            spotify_url = link_new_episode(cursor, table_name, episode_id, title, date)
+            if spotify_url:
+                logging.info(f"Linked Spotify URL for {title}: {spotify_url}")
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Could not link Spotify episode: {e}")
+
+
+def link_spotify_episodes(cursor, table_name, episodes):
+    """Store the URLs of these Spotify episodes on the podcast episodes they match."""
+    for episode in episodes:
+        try:
+            episode_id = link_spotify_episode(cursor, table_name, episode['Title'], episode['Date'], episode['URL'])
+            if episode_id:
+                logging.info(f"Linked Spotify URL to {table_name} episode {episode_id}: {episode['Title']}")
+        except sqlite3.OperationalError as e:
+            # A missing table or column fails every episode alike, so warn once
+            logging.warning(f"Could not link Spotify episodes to {table_name}: {e}")
+            return
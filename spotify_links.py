@@ -0,0 +1,125 @@
+"""
+Spotify Link Resolution for TMASearcher
+Matches podcast episodes to their Spotify counterparts and stores the
+Spotify URL on the episode row, so lookups never have to fuzzy-match.
+"""
+from fuzzywuzzy import process
+
+from title_matcher import get_matcher
+from titles import normalize_title
+
+# Podcast table -> table filled by its Spotify source in scrapers/sources.py
+SPOTIFY_TABLES = {
+    'TMA': 'TMASpot',
+    'TMShow': 'TMShowSpot',
+    'Balloon': 'BalloonSpot',
+}
+
+# Minimum fuzzywuzzy score for two titles to count as the same episode
+MATCH_SCORE_CUTOFF = 80
+
+# Spotify release dates can drift a little from the tmastl.com post date
+DATE_WINDOW_DAYS = 3
+
+
+def find_spotify_url(cursor, spot_table, title):
+    """Fuzzy-match a title against the episodes in a Spotify table.
+
+    This is the path used when an episode has not been linked yet. The
+    cached trigram matcher narrows the table to a few candidate titles first.
+    Returns the Spotify URL of the best match, or None.
+    """
+    match = get_matcher(spot_table).match(cursor, title, score_cutoff=MATCH_SCORE_CUTOFF)
+    return match[2] if match else None
+
+
+def link_spotify_episode(cursor, table_name, spotify_title, release_date, spotify_url):
+    """Store a Spotify URL on the unlinked episode it matches.
+
+    Only episodes dated within DATE_WINDOW_DAYS of the Spotify release are
+    considered, read through the (DATE, title_key) index. An episode with the
+    same title_key wins outright; the fuzzy pass over the window's handful of
+    titles only runs when there is none.
+    Returns the linked episode ID (including one linked on an earlier run),
+    or None if nothing matched.
+    """
+    cursor.execute(f"SELECT ID FROM {table_name} WHERE spotify_url = ?", (spotify_url,))
+    linked = cursor.fetchone()
+    if linked:
+        return linked[0]
+
+    window = f'{DATE_WINDOW_DAYS} days'
+    cursor.execute(f'''
+        SELECT ID, TITLE, title_key FROM {table_name}
+        WHERE spotify_url IS NULL
+        AND DATE BETWEEN date(?, '-' || ?) AND date(?, '+' || ?)
+    ''', (release_date, window, release_date, window))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    title_key = normalize_title(spotify_title)
+    exact = [episode_id for episode_id, _, key in rows if key == title_key]
+    if exact:
+        episode_id = exact[0]
+    else:
+        candidates = {episode_id: title for episode_id, title, _ in rows}
+        match = process.extractOne(spotify_title, candidates, score_cutoff=MATCH_SCORE_CUTOFF)
+        if not match:
+            return None
+        episode_id = match[2]
+
+    cursor.execute(f"UPDATE {table_name} SET spotify_url = ? WHERE ID = ?", (spotify_url, episode_id))
+    return episode_id
+
+
+def link_new_episode(cursor, table_name, episode_id, title, date):
+    """Link a freshly scraped episode to a Spotify episode stored before it.
+
+    Only Spotify releases within DATE_WINDOW_DAYS that are not linked
+    elsewhere are considered, read through the (Date, title_key) index. A
+    release with the same title_key wins outright; otherwise the best fuzzy
+    match among them. Returns the Spotify URL, or None.
+    """
+    spot_table = SPOTIFY_TABLES[table_name]
+    window = f'{DATE_WINDOW_DAYS} days'
+    cursor.execute(f'''
+        SELECT URL, Title, title_key FROM {spot_table}
+        WHERE Date BETWEEN date(?, '-' || ?) AND date(?, '+' || ?)
+        AND NOT EXISTS (SELECT 1 FROM {table_name} WHERE spotify_url = {spot_table}.URL)
+    ''', (date, window, date, window))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    title_key = normalize_title(title)
+    exact = [url for url, _, key in rows if key == title_key]
+    if exact:
+        spotify_url = exact[0]
+    else:
+        candidates = {url: spotify_title for url, spotify_title, _ in rows}
+        match = process.extractOne(title, candidates, score_cutoff=MATCH_SCORE_CUTOFF)
+        if not match:
+            return None
+        spotify_url = match[2]
+
+    cursor.execute(f"UPDATE {table_name} SET spotify_url = ? WHERE ID = ? AND spotify_url IS NULL", (spotify_url, episode_id))
+    return spotify_url
+
+
+def link_spotify_table(cursor, table_name):
+    """Try to link every stored Spotify episode to its podcast episode.
+
+    Returns the number of episodes that were linked.
+    """
+    spot_table = SPOTIFY_TABLES[table_name]
+    cursor.execute(f'''
+        SELECT Title, Date, URL FROM {spot_table}
+        WHERE URL NOT IN (SELECT spotify_url FROM {table_name} WHERE spotify_url IS NOT NULL)
+        ORDER BY Date DESC
+    ''')
+    linked = 0
+    for title, release_date, url in cursor.fetchall():
+        if link_spotify_episode(cursor, table_name, title, release_date, url):
+            linked += 1
+    return linked
@@ -0,0 +1,345 @@
+"""
+Buffered Stream Counter for TMASearcher
+Play events are added up in memory and written to the database in one
+transaction every few seconds, instead of one UPDATE and commit per play.
+Without a journal, a crash loses at most one flush interval of plays. With
+a journal, every increment is also appended to a local file first, and
+journals left behind by dead processes are replayed on startup. Each journal
+starts with an id that is recorded in the same transaction that writes its
+plays, so a journal whose plays were already written is never counted twice.
+
+RecentPlays drops repeat plays from the same listener before they reach the
+counter, so reloads, extra tabs and scripted clients cannot inflate counts.
+"""
+import atexit
+import glob
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import db
+from query_cache import bump_generation
+
+DEFAULT_FLUSH_INTERVAL = 5  # seconds
+
+# Ids of journals whose plays are in the database, kept until the file is gone
+JOURNAL_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS stream_journal_flushes (
+        journal_id TEXT PRIMARY KEY,
+        flushed_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+# Same cooldown as streamTracking in static/js/player_ui.js
+DEDUP_WINDOW = 300  # seconds
+DEDUP_BUCKET = 60  # seconds
+DEDUP_MAX_ENTRIES = 200000
+
+
+def _pid_alive(pid):
+    """Whether a process with this pid is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RecentPlays:
+    """Remembers (listener, podcast, episode) plays for a rolling window.
+
+    Plays are kept in one set per time bucket, so expiry is dropping whole
+    buckets rather than scanning entries. Keys are stored as 8-byte digests,
+    and the oldest buckets are dropped early if max_entries is reached, which
+    bounds memory at the cost of forgetting some plays early under heavy load.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW, bucket_seconds=DEDUP_BUCKET, max_entries=DEDUP_MAX_ENTRIES):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self._buckets = {}  # bucket number -> set of digests
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(listener, podcast, episode_id):
+        key = f"{listener}\x1f{podcast}\x1f{episode_id}".encode('utf-8')
+        return hashlib.blake2b(key, digest_size=8).digest()
+
+    def seen(self, listener, podcast, episode_id, now=None):
+        """Record a play and return True if it repeats one inside the window."""
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        # A play in the oldest live bucket may be up to one bucket past the window
+        oldest = current - self.window // self.bucket_seconds
+        digest = self._digest(listener, podcast, episode_id)
+
+        with self._lock:
+            for bucket in [b for b in self._buckets if b < oldest]:
+                self._size -= len(self._buckets.pop(bucket))
+            if any(digest in plays for plays in self._buckets.values()):
+                return True
+
+            self._buckets.setdefault(current, set()).add(digest)
+            self._size += 1
+            while self._size > self.max_entries and len(self._buckets) > 1:
+                self._size -= len(self._buckets.pop(min(self._buckets)))
+            return False
+
+
+def listener_key(user_id=None, remote_addr=None, user_agent=None):
+    """Identify a listener: the user id when logged in, else address and agent."""
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"anon:{remote_addr}:{user_agent or ''}"
+
+
+class StreamCounter:
+    """Accumulates streams_count increments and flushes them in batches."""
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL, journal_path=None, db_path=None):
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.db_path = db_path
+        self._pending = {}  # (table, episode_id) -> plays not yet written
+        self._known = {}  # (table, episode_id) -> streams_count as last read or written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._journal = None
+        self._journal_id = None
+        self._discarded_ids = []  # flushed journals whose files are gone
+
+    def estimate(self, cursor, table_name, episode_id):
+        """Estimated streams_count without recording a play, or None if missing."""
+        key = (table_name, episode_id)
+        with self._lock:
+            if key in self._known:
+                return self._known[key] + self._pending.get(key, 0)
+        cursor.execute(f'SELECT streams_count FROM {table_name} WHERE id = ?', (episode_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            return (row[0] or 0) + self._pending.get(key, 0)
+
+    def increment(self, cursor, table_name, episode_id):
+        """Record one play and return the estimated streams_count.
+
+        Returns None if the episode does not exist; nothing is recorded then.
+        cursor is only used the first time an episode is seen, to read its
+        stored count.
+        """
+        key = (table_name, episode_id)
+        if key not in self._known:
+            cursor.execute(f'SELECT streams_count FROM {table_name} WHERE id = ?', (episode_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            with self._lock:
+                self._known.setdefault(key, row[0] or 0)
+
+        with self._lock:
+            if self._journal is not None:
+                self._journal.write(f"{table_name}\t{episode_id}\t1\n")
+                self._journal.flush()
+            self._pending[key] = self._pending.get(key, 0) + 1
+            return self._known[key] + self._pending[key]
+
+    def flush(self):
+        """Write all pending increments in a single transaction."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                flushing, journal_id = self._rotate_journal()
+            if not pending:
+                self._discard(flushing)
+                return 0
+
+            conn = db.connect(self.db_path)
+            try:
+                with conn:
+                    self._write(conn, pending, journal_id)
+                    self._forget_journals(conn, self._discarded_ids)
+            except sqlite3.Error as e:
+                logging.error(f"Stream count flush failed, keeping {len(pending)} episodes pending: {e}")
+                with self._lock:
+                    for key, delta in pending.items():
+                        self._pending[key] = self._pending.get(key, 0) + delta
+                        if self._journal is not None:
+                            self._journal.write(f"{key[0]}\t{key[1]}\t{delta}\n")
+                    if self._journal is not None:
+                        self._journal.flush()
+                self._discard(flushing)
+                return 0
+            finally:
+                conn.close()
+
+            with self._lock:
+                for key, delta in pending.items():
+                    # Replayed episodes have no known base yet; they are read on next play
+                    if key in self._known:
+                        self._known[key] += delta
+            self._discard(flushing)
+            self._discarded_ids = [journal_id] if journal_id else []
+            return len(pending)
+
+    @staticmethod
+    def _write(conn, pending, journal_id=None):
+        """Add pending plays to the stored counts, and record the journal they came from.
+
+        Runs inside the caller's transaction.
+        """
+        by_table = {}
+        for (table_name, episode_id), delta in pending.items():
+            by_table.setdefault(table_name, []).append((delta, episode_id))
+        for table_name, rows in by_table.items():
+            conn.executemany(f'''
+                UPDATE {table_name}
+                SET streams_count = COALESCE(streams_count, 0) + ?
+                WHERE id = ?
+            ''', rows)
+        # Lets caches of stream-count listings notice the new counts
+        bump_generation(conn.cursor(), 'streams')
+        if journal_id:
+            conn.execute("INSERT OR IGNORE INTO stream_journal_flushes (journal_id) VALUES (?)", (journal_id,))
+
+    @staticmethod
+    def _forget_journals(conn, journal_ids):
+        conn.executemany("DELETE FROM stream_journal_flushes WHERE journal_id = ?", [(i,) for i in journal_ids])
+
+    def start(self):
+        """Replay leftover journals and start the background flusher."""
+        if self._thread is not None:
+            return
+        if self.journal_path:
+            conn = db.connect(self.db_path)
+            try:
+                with conn:
+                    conn.execute(JOURNAL_TABLE_SQL)
+            finally:
+                conn.close()
+            self._replay_journals()
+            self._open_journal()
+        self._thread = threading.Thread(target=self._run, name='stream-counter', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flusher and write whatever is still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+                if not self._pending:  # Only the header is left
+                    os.remove(self._journal_file())
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _journal_file(self):
+        return f"{self.journal_path}.{os.getpid()}"
+
+    def _open_journal(self):
+        """Start a new live journal under a fresh id."""
+        self._journal_id = uuid.uuid4().hex
+        self._journal = open(self._journal_file(), 'w')
+        self._journal.write(f"#{self._journal_id}\n")
+        self._journal.flush()
+
+    def _rotate_journal(self):
+        """Move the live journal aside while its increments are being flushed.
+
+        Called with self._lock held. Returns the path and id of the set-aside
+        file, or (None, None) without a journal.
+        """
+        if self._journal is None:
+            return None, None
+        self._journal.close()
+        flushing, journal_id = f"{self._journal_file()}.flushing", self._journal_id
+        os.replace(self._journal_file(), flushing)
+        self._open_journal()
+        return flushing, journal_id
+
+    @staticmethod
+    def _discard(path):
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _read_journal(path):
+        """(journal id, {(table, episode_id): plays}) from a journal file."""
+        journal_id, pending = None, {}
+        with open(path) as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    continue  # partial line from a crash mid-write
+                if line.startswith('#'):
+                    journal_id = line[1:].rstrip('\n')
+                    continue
+                table_name, episode_id, delta = line.rstrip('\n').split('\t')
+                key = (table_name, int(episode_id))
+                pending[key] = pending.get(key, 0) + int(delta)
+        return journal_id, pending
+
+    def _replay_journals(self):
+        """Write the increments of journals whose writing process has exited.
+
+        Each journal is written in its own transaction, together with its id,
+        before its file is removed. A journal whose id is already recorded was
+        written before a crash and is only removed.
+        """
+        conn = db.connect(self.db_path)
+        try:
+            for path in glob.glob(f"{self.journal_path}.*"):
+                pid = path[len(self.journal_path) + 1:].split('.')[0]
+                if not pid.isdigit() or (int(pid) != os.getpid() and _pid_alive(int(pid))):
+                    continue
+                # Claim the file first so two starting workers cannot both replay it
+                claimed = f"{self._journal_file()}.replay"
+                try:
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    continue
+                journal_id, pending = self._read_journal(claimed)
+                try:
+                    with conn:
+                        flushed = journal_id and conn.execute(
+                            "SELECT 1 FROM stream_journal_flushes WHERE journal_id = ?", (journal_id,)
+                        ).fetchone()
+                        if not flushed and pending:
+                            self._write(conn, pending, journal_id)
+                except sqlite3.Error as e:
+                    # The claimed file and any not yet claimed are replayed by a later start
+                    logging.error(f"Stream journal replay failed, keeping {claimed}: {e}")
+                    break
+                os.remove(claimed)
+                if journal_id:
+                    try:
+                        with conn:
+                            self._forget_journals(conn, [journal_id])
+                    except sqlite3.Error:
+                        pass  # A leftover id is harmless; its file is gone
+                if flushed:
+                    logging.info(f"Removed stream journal {path}, already written")
+                elif pending:
+                    logging.info(f"Replayed stream journal {path} for {len(pending)} episodes")
+        finally:
+            conn.close()
@@ -0,0 +1,62 @@
+"""
+The lxml extraction in scrapers/extract.py has to return exactly what its
+BeautifulSoup fallback returns, so the stored show notes do not depend on
+whether lxml is installed. Each saved page in tests/pages is run through
+both paths of the public functions and the results compared.
+"""
+import os
+import unittest
+from unittest import mock
+
+from scrapers import extract
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def read_page(name):
+    with open(os.path.join(PAGES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def without_lxml(function, html):
+    """Result of an extract function on its BeautifulSoup fallback path."""
+    with mock.patch.object(extract, 'lxml', None):
+        result = function(html)
+        return list(result) if not isinstance(result, (str, type(None))) else result
+
+
+@unittest.skipIf(extract.lxml is None, "lxml is not installed")
+class LxmlMatchesBeautifulSoup(unittest.TestCase):
+
+    def test_listing_episodes(self):
+        html = read_page('show_listing.html')
+        episodes = list(extract.listing_episodes(html))
+        self.assertEqual(len(episodes), 2)
+        self.assertEqual(episodes, without_lxml(extract.listing_episodes, html))
+
+    def test_episode_links(self):
+        html = read_page('tma_listing.html')
+        links = list(extract.episode_links(html))
+        self.assertEqual(len(links), 3)
+        self.assertEqual(links, without_lxml(extract.episode_links, html))
+
+    def test_page_show_notes(self):
+        html = read_page('episode_page.html')
+        notes = extract.page_show_notes(html)
+        self.assertIn("Hour 1", notes)
+        self.assertNotIn("Related episodes", notes)
+        self.assertEqual(notes, without_lxml(extract.page_show_notes, html))
+
+    def test_whitespace_between_paragraphs(self):
+        html = '<div class="the_content"><p>A</p>\n <p>B</p></div>'
+        self.assertEqual(extract.page_show_notes(html), 'A\n\n\nB')
+        self.assertEqual(extract.page_show_notes(html), without_lxml(extract.page_show_notes, html))
+
+    def test_page_without_notes(self):
+        for html in ['<html><body><p>Not found</p></body></html>', '']:
+            self.assertIsNone(extract.page_show_notes(html))
+            self.assertIsNone(without_lxml(extract.page_show_notes, html))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Cached Fuzzy Title Matcher for TMASearcher
+Keeps a trigram index of a table's normalized titles in memory so a fuzzy
+lookup only scores the few titles that share trigrams with the query.
+"""
+import re
+import threading
+from collections import Counter
+
+from fuzzywuzzy import process
+
+# Titles scored with fuzzywuzzy after trigram filtering
+MAX_CANDIDATES = 25
+
+
+def normalize_for_matching(title):
+    """Lowercase a title and reduce it to single-spaced words."""
+    title = title.replace("’", "'").replace("‘", "'").lower()
+    return ' '.join(re.sub(r"[^\w']+", ' ', title).split())
+
+
+def trigrams(text):
+    """Set of character trigrams in text, padded so short words still count."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleMatcher:
+    """Trigram-indexed fuzzy lookup over the titles of one table.
+
+    The index is rebuilt whenever the table's row count or max rowid changes,
+    which is cheap to check on every lookup.
+    """
+
+    def __init__(self, table_name, title_column='Title', value_column='URL'):
+        self.table_name = table_name
+        self.title_column = title_column
+        self.value_column = value_column
+        self._signature = None
+        # (titles, values, trigram -> positions), swapped as one snapshot on rebuild
+        self._state = ([], [], {})
+        self._lock = threading.Lock()
+
+    def _table_signature(self, cursor):
+        cursor.execute(f"SELECT COUNT(*), MAX(rowid) FROM {self.table_name}")
+        return tuple(cursor.fetchone())
+
+    def _rebuild(self, cursor, signature):
+        cursor.execute(f"SELECT {self.title_column}, {self.value_column} FROM {self.table_name}")
+        titles, values, index = [], [], {}
+        for title, value in cursor.fetchall():
+            position = len(titles)
+            titles.append(title)
+            values.append(value)
+            for gram in trigrams(normalize_for_matching(title or '')):
+                index.setdefault(gram, []).append(position)
+
+        self._state = (titles, values, index)
+        self._signature = signature
+
+    def refresh(self, cursor):
+        """Rebuild the index if the table changed since it was last loaded."""
+        signature = self._table_signature(cursor)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._rebuild(cursor, signature)
+
+    @staticmethod
+    def _candidates(index, title):
+        """Positions of the titles sharing the most trigrams with title."""
+        overlap = Counter()
+        for gram in trigrams(normalize_for_matching(title)):
+            overlap.update(index.get(gram, ()))
+        return [position for position, _ in overlap.most_common(MAX_CANDIDATES)]
+
+    def match(self, cursor, title, score_cutoff=80):
+        """Best fuzzy match for title as (title, score, value), or None."""
+        self.refresh(cursor)
+        titles, values, index = self._state
+        choices = {values[position]: titles[position] for position in self._candidates(index, title)}
+        if not choices:
+            return None
+        return process.extractOne(title, choices, score_cutoff=score_cutoff)
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(table_name, title_column='Title', value_column='URL'):
+    """Process-wide matcher for a table, created on first use."""
+    key = (table_name, title_column, value_column)
+    with _matchers_lock:
+        if key not in _matchers:
+            _matchers[key] = TitleMatcher(table_name, title_column, value_column)
+        return _matchers[key]
@@ -0,0 +1,36 @@
+"""
+Title Keys for TMASearcher
+The one normalization used to tell whether two episode titles are the same
+episode. Every episode table stores it in a title_key column, indexed with
+DATE, so exact (date, title) matches are index seeks instead of scans.
+"""
+import unicodedata
+
+# Tables with a title_key column -> their (title, date) columns
+TITLE_KEY_TABLES = {
+    'TMA': ('TITLE', 'DATE'),
+    'TMShow': ('TITLE', 'DATE'),
+    'Balloon': ('TITLE', 'DATE'),
+    'TMASpot': ('Title', 'Date'),
+    'TMShowSpot': ('Title', 'Date'),
+    'BalloonSpot': ('Title', 'Date'),
+}
+
+
+def normalize_title(title):
+    """Normalize Unicode, apostrophes, dashes and ellipses, then trim and lowercase."""
+    title = unicodedata.normalize('NFKC', title)
+    title = title.replace("’", "'").replace("‘", "'")
+    title = title.replace("–", "-").replace("—", "-").replace("−", "-").replace("‒", "-")
+    title = title.replace("…", "...")
+    return title.strip().lower()
+
+
+def title_key_index_sql(table_name, date_column=None):
+    """CREATE INDEX statement for a table's (date, title_key) index.
+
+    date_column defaults to the table's entry in TITLE_KEY_TABLES.
+    """
+    date_column = date_column or TITLE_KEY_TABLES[table_name][1]
+    return (f"CREATE INDEX IF NOT EXISTS idx_{table_name.lower()}_date_title_key "
+            f"ON {table_name}({date_column}, title_key);")